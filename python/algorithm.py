@@ -1,9 +1,28 @@
+import pathlib
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from typing import Optional
 
 from mapfmclient import Problem, Solution
 
+from python.benchmarks.stats import RunStats
+
 
 class MapfAlgorithm(ABC):
+    # directory in which the solver binaries are run and write their scratch files
+    # (temp/, outputs/, paths.txt, output.yaml). The benchmark runner gives every worker its own.
+    workdir: pathlib.Path = pathlib.Path(".")
+    # time.monotonic() value at which the current run times out, solver binaries are killed when it passes
+    deadline: Optional[float] = None
+    # timings of the current run, set by the benchmark runner
+    stats: Optional[RunStats] = None
+    # bytes of memory the solver binaries of the current run may use, see run_solver
+    memory_limit: Optional[int] = None
+
+    def phase(self, name: str):
+        # times a phase of the current run, see RunStats
+        return nullcontext() if self.stats is None else self.stats.phase(name)
+
     @abstractmethod
     def solve(self, problem: Problem) -> Solution:
         raise NotImplemented
@@ -20,3 +39,8 @@ class MapfAlgorithm(ABC):
     @property
     def version(self) -> str:
         return "0.0.1"
+
+    @property
+    def binaries(self) -> list[str]:
+        # executables the results depend on, their checksums are part of the key results are cached by
+        return []
@@ -0,0 +1,108 @@
+"""
+Generates and runs benchmark suites.
+
+    PYTHONPATH=. python -m python.benchmarks 32x32_1 warehouse --processes 8
+    PYTHONPATH=. python -m python.benchmarks my_suite --teams 4 --size 64x64 --agents 1-40 --solvers CBS-TA
+    PYTHONPATH=. python -m python.benchmarks --config suites.yaml
+
+Suites not in default_suites are made from the options. Options given on the command line override
+the values of every suite. A config is a yaml list of SuiteSpec fields.
+"""
+import argparse
+import dataclasses
+import os
+from typing import Tuple
+
+import yaml
+
+from python.benchmarks.benchmark import SuiteSpec, cache_path, default_suites, run_suites, solvers
+from python.benchmarks.cache import ResultCache
+
+
+def pair(separator: str):
+    """
+    An argparse type for "A<separator>B" or a single "A", which stands for "A<separator>A".
+    """
+    def parse(value: str) -> Tuple[int, int]:
+        try:
+            values = [int(v) for v in value.split(separator)]
+        except ValueError:
+            values = []
+        if len(values) not in (1, 2):
+            raise argparse.ArgumentTypeError(f"expected N or N{separator}M, got {value}")
+        return values[0], values[-1]
+    return parse
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m python.benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("suites", nargs="*", help=f"names of suites, defaults: {', '.join(default_suites)}")
+    parser.add_argument("--config", help="yaml file with a list of suites")
+    parser.add_argument("--teams", type=int)
+    parser.add_argument("--size", type=pair("x"), help="WIDTHxHEIGHT, or SIZE for a square")
+    parser.add_argument("--file", help="base map to place agents on instead of generating mazes")
+    parser.add_argument("--suite-file", help="suite file (see python.benchmarks.suite) to run the maps of instead "
+                                             "of the batch directories")
+    parser.add_argument("--agents", type=pair("-"), help="range of numbers of agents, MIN-MAX, or one number")
+    parser.add_argument("--maps", type=int, help="maps per number of agents")
+    parser.add_argument("--timeout", type=int, help="seconds per map")
+    parser.add_argument("--memory-limit", type=int, help="MiB of memory per run, runs that need more are memouts")
+    parser.add_argument("--solvers", help=f"comma separated, out of {', '.join(solvers)}")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--policy", help='which batches to run: "zero" (until one is not solved at all), '
+                                         '"threshold[:FRACTION[:Z]]" or "bisect[:TARGET]"')
+    parser.add_argument("--processes", type=int, default=int(os.environ.get("BENCHMARK_PROCESSES", 1)),
+                        help="maps solved in parallel over all suites")
+    parser.add_argument("--no-generate", dest="generate", action="store_false", help="only run existing maps")
+    parser.add_argument("--no-graph", dest="graph", action="store_false")
+    parser.add_argument("--measure", choices=["wall_time", "process_time", "solver_time"],
+                        help="also graph the times of the solved runs, process_time leaves out writing input and "
+                             "parsing output, solver_time is the runtime the solver reports")
+    parser.add_argument("--cache", default=str(cache_path), help="file with the results of all suites by problem")
+    parser.add_argument("--no-cache", dest="cache", action="store_const", const=None,
+                        help="run every map, even when it was run before with the same solver")
+    return parser.parse_args(argv)
+
+
+def suites_from_args(args: argparse.Namespace) -> list[SuiteSpec]:
+    suites = []
+    if args.config:
+        with open(args.config) as f:
+            suites.extend(SuiteSpec(**values) for values in yaml.safe_load(f))
+    suites.extend(default_suites.get(name, SuiteSpec(name)) for name in args.suites)
+    if not suites:
+        suites = list(default_suites.values())
+
+    overrides = {
+        key: value for key, value in {
+            "teams": args.teams,
+            "file": args.file,
+            "suite_file": args.suite_file,
+            "maps": args.maps,
+            "timeout": args.timeout,
+            "memory_limit": args.memory_limit,
+            "seed": args.seed,
+            "policy": args.policy,
+        }.items() if value is not None
+    }
+    if args.size:
+        overrides["width"], overrides["height"] = args.size
+    if args.agents:
+        overrides["min_agents"], overrides["max_agents"] = args.agents
+    if args.solvers:
+        overrides["solvers"] = args.solvers.split(",")
+        unknown = set(overrides["solvers"]) - set(solvers)
+        if unknown:
+            raise SystemExit(f"unknown solvers: {', '.join(sorted(unknown))}")
+    return [dataclasses.replace(suite, **overrides) for suite in suites]
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    run_suites(suites_from_args(args), args.processes, generate=args.generate, graph=args.graph,
+               cache=None if args.cache is None else ResultCache(args.cache), measure=args.measure)
+
+
+if __name__ == '__main__':
+    main()
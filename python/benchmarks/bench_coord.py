@@ -0,0 +1,66 @@
+"""
+Microbenchmark of the coordinate representations used by the map generator:
+the old dict based Coord, the __slots__ Coord and packed y * width + x ints.
+
+    PYTHONPATH=. python python/benchmarks/bench_coord.py
+"""
+import random
+import timeit
+import tracemalloc
+
+from python.coord import Coord, pack, unpack
+
+width = 128
+height = 128
+n = 100_000
+
+
+class DictCoord:
+    # Coord as it was before it got __slots__
+    def __init__(self, x: int, y: int):
+        self.x = x
+        self.y = y
+
+    def __hash__(self) -> int:
+        return tuple.__hash__((self.x, self.y))
+
+    def __eq__(self, other):
+        return (self.x, self.y) == (other.x, other.y)
+
+    def __add__(self, other):
+        return DictCoord(self.x + other.x, self.y + other.y)
+
+
+def allocated(make) -> int:
+    tracemalloc.start()
+    objects = make()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return size
+
+
+def main():
+    cells = [(random.randrange(width), random.randrange(height)) for _ in range(n)]
+    representations = {
+        "DictCoord": (lambda: [DictCoord(x, y) for x, y in cells], lambda c: c + DictCoord(1, 0)),
+        "Coord": (lambda: [Coord(x, y) for x, y in cells], lambda c: c + Coord(1, 0)),
+        "packed": (lambda: [pack(x, y, width) for x, y in cells], lambda c: c + 1),
+    }
+
+    print(f"{'':10} {'create':>10} {'bytes/obj':>10} {'set build':>10} {'lookup':>10} {'add':>10}   (ms per {n})")
+    for name, (make, add) in representations.items():
+        objects = make()
+        lookup = set(objects[: n // 2])
+        create = timeit.timeit(make, number=5) / 5
+        build = timeit.timeit(lambda: set(objects), number=5) / 5
+        member = timeit.timeit(lambda: sum(1 for o in objects if o in lookup), number=5) / 5
+        step = timeit.timeit(lambda: [add(o) for o in objects], number=5) / 5
+        size = allocated(make) / n
+        print(f"{name:10} {create * 1e3:10.2f} {size:10.1f} {build * 1e3:10.2f} {member * 1e3:10.2f} {step * 1e3:10.2f}")
+
+    assert all(unpack(pack(x, y, width), width) == (x, y) for x, y in cells)
+
+
+if __name__ == '__main__':
+    main()
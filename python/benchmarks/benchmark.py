@@ -0,0 +1,304 @@
+import itertools
+import os
+import pathlib
+import queue
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from multiprocessing import Pool
+from typing import Callable, Dict, List, Optional, Tuple
+
+from mapfmclient import Problem
+from tqdm import tqdm
+
+from python.algorithm import MapfAlgorithm
+from python.benchmarks.cache import ResultCache, solver_key
+from python.benchmarks.comparison import BCPInmatch, BCPPrematch, CBSInmatch, CBSPrematch, CBSTA
+from python.benchmarks.grid_stats import write_report
+from python.benchmarks.map import MapGenerator
+from python.benchmarks.parse_map import MapParser
+from python.benchmarks.policy import make_policy
+from python.benchmarks.results import CANCELLED, ResultStore, RunRecord, num_teams, owner_id
+from python.benchmarks.suite import SuiteParser
+from python.benchmarks.run_with_timeout import RunResult, init_worker, run_claimed_problem, scratch_dir
+
+this_dir = pathlib.Path(__file__).parent.absolute()
+# results of all suites by problem content, see ResultCache
+cache_path = this_dir / "cache.jsonl"
+# the results_<solver>.txt files of earlier benchmarks were made with this timeout and without a memory limit
+legacy_timeout = 60
+
+solvers: Dict[str, Callable[[], MapfAlgorithm]] = {
+    "BCPPrematch": BCPPrematch,
+    "BCPInmatch": BCPInmatch,
+    "CBSPrematch": CBSPrematch,
+    "CBSInmatch": CBSInmatch,
+    "CBS-TA": CBSTA,
+}
+
+
+@dataclass
+class SuiteSpec:
+    name: str
+    teams: int = 1
+    width: int = 32
+    height: int = 32
+    # base map the agents are placed on, instead of generated mazes
+    file: Optional[str] = None
+    # suite file (see suite.py) the maps are run from instead of the batch directories, it is not generated
+    suite_file: Optional[str] = None
+    min_agents: int = 1
+    max_agents: int = 100
+    # maps per number of agents
+    maps: int = 30
+    timeout: int = 60
+    # MiB of memory every solver run may use, unlimited if None
+    memory_limit: Optional[int] = None
+    solvers: List[str] = field(default_factory=lambda: list(solvers))
+    open_factor: float = 0.65
+    max_neighbors: int = 3
+    min_goal_distance: float = 0
+    seed: int = 0
+    # which batches are run, see make_policy
+    policy: str = "zero"
+
+    @property
+    def directory(self) -> pathlib.Path:
+        return this_dir / self.name
+
+    @property
+    def memory_limit_bytes(self) -> Optional[int]:
+        return None if self.memory_limit is None else self.memory_limit * 1024 * 1024
+
+    def generate(self, processes: Optional[int] = None):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.suite_file is not None:
+            return
+        MapGenerator(self.directory).generate_even_batches(
+            range(self.min_agents, self.max_agents + 1),
+            self.maps,
+            self.width, self.height,
+            self.teams,
+            prefix=self.name,
+            min_goal_distance=self.min_goal_distance,
+            open_factor=self.open_factor,
+            max_neighbors=self.max_neighbors,
+            file=self.file,
+            seed=self.seed,
+            processes=processes or os.cpu_count(),
+        )
+
+
+# the suites of the graphs in the paper
+default_suites: Dict[str, SuiteSpec] = {
+    suite.name: suite for suite in [
+        SuiteSpec("32x32_1", teams=1),
+        SuiteSpec("32x32_3", teams=3),
+        SuiteSpec("32x32_6", teams=6),
+        SuiteSpec("32x32_12", teams=12),
+        SuiteSpec("warehouse", teams=3, file="maps/warehouse.map"),
+    ]
+}
+
+
+class Sweep:
+    """
+    The runs of one solver on one suite, one batch (number of agents) at a time. Which batches are run, and
+    when the rest of a batch is cancelled, is up to the suite's sweep policy.
+    """
+
+    def __init__(self, suite: SuiteSpec, solver: str, cache: Optional[ResultCache] = None):
+        self.suite = suite
+        self.solver = solver
+        self.key = solver_key(solvers[solver]())
+        self.cache = cache
+        self.policy = make_policy(suite.policy)
+        self.parser = MapParser(suite.directory) if suite.suite_file is None else SuiteParser(suite.suite_file)
+        # claims of drivers that did not report back within 10 timeouts are taken over,
+        # results of another solver version, timeout or memory limit, and runs another policy skipped, are run again
+        self.store = ResultStore(suite.directory / "results.jsonl", claim_expiry=10 * suite.timeout, key=self.key,
+                                 timeout=suite.timeout, memory_limit=suite.memory_limit_bytes, policy=suite.policy)
+        self.owner = owner_id()
+        # num agents : solutions
+        self.results: Dict[int, List[Optional[float]]] = {}
+        self.pending = 0
+
+        legacy = suite.directory / f"results_{solver}.txt"
+        # they have no solver version to check, only the settings
+        if legacy.exists() and suite.timeout == legacy_timeout and suite.memory_limit is None:
+            print(f"data exists for {solver} in {legacy.name}")
+            self.path = legacy
+            self._batches: Dict[int, str] = {}
+        else:
+            self.path = self.store.path
+            self._batches = {n: folder for n, folder in self.parser.iter_batches()
+                             if suite.min_agents <= n <= suite.max_agents}
+        self._current: Optional[int] = None
+        # the maps of the running batch, whether its finished maps were solved and its size
+        self._todo: List[Tuple[str, Problem]] = []
+        self._outcomes: List[bool] = []
+        self._total = 0
+
+    @property
+    def done(self) -> bool:
+        return not self._batches and self.pending == 0
+
+    def next_batch(self) -> List[Tuple[str, Problem]]:
+        """
+        The maps of the next batch to run, batches that are finished or skipped are handled on the way.
+        Returns an empty list when the sweep is done.
+        """
+        self._finish_batch()
+        while self._batches:
+            num_agents = self.policy.next(sorted(self._batches), self.results, self.suite.maps)
+            if num_agents is None:
+                self._skip_remaining()
+                break
+            folder = self._batches.pop(num_agents)
+            names = self.parser.batch_names(folder)
+
+            # maps that were finished before, or by another driver sharing the store, are not run again
+            todo_names = [n for n in names if not self.store.finished(self.solver, n)]
+            self._current = num_agents
+            if not todo_names:
+                print(f"found data for part {num_agents}")
+                self._finish_batch()
+                continue
+
+            # batches are only parsed, and their maps that are only in the manifest written, when they are run
+            todo = [problem for problem in self.parser.parse_batch(folder, todo_names) if not self._cached(problem)]
+            if not todo:
+                self._finish_batch()
+                continue
+            for problem in todo:
+                problem[1].name = problem[0]
+            self.pending = len(todo)
+            self._todo = todo
+            finished = self.store.times(self.solver, cancelled=True).get(num_agents, [])
+            self._outcomes = [t is not None for t in finished]
+            self._total = len(names)
+            return todo
+        return []
+
+    def record(self, problem: Tuple[str, Problem], result: Optional[RunResult]):
+        # result is None when another driver claimed the map, or it was cancelled before it started
+        if result is not None:
+            record = RunRecord.from_run(self.solver, problem, result, self.suite.memory_limit_bytes)
+            self.store.append(record)
+            if self.cache is not None:
+                self.cache.add_record(problem[1], self.key, self.suite.timeout, record)
+            self._outcomes.append(result[0] is not None)
+        self.pending -= 1
+        if self.pending and self._todo and self.policy.decided(self._outcomes, self._total):
+            # maps that are recorded are not claimed by the workers anymore, so only the running maps still finish
+            for p in self._todo:
+                if not self.store.finished(self.solver, p[0]):
+                    self.store.append(RunRecord.skipped(self.solver, p, CANCELLED))
+            tqdm.write(f"{self.solver} on {self.suite.name} with {self._current} agents: decided, "
+                       f"cancelling the rest of the batch")
+            self._todo = []
+
+    def _cached(self, problem: Tuple[str, Problem]) -> bool:
+        # records a run of the same problem from the cache, also when it was made in another suite or with another
+        # timeout it can be reused for, but only with the same memory limit
+        run = None if self.cache is None else \
+            self.cache.lookup(problem[1], self.key, self.suite.timeout, self.suite.memory_limit_bytes)
+        if run is None:
+            return False
+        self.store.append(RunRecord(self.solver, problem[0], len(problem[1].starts), num_teams(problem[1]),
+                                    run.status, run.wall_time, run.cost, run.makespan,
+                                    process_time=run.process_time, solver_stats=run.solver_stats))
+        return True
+
+    def _skip_remaining(self):
+        for num_agents, folder in sorted(self._batches.items()):
+            names = [n for n in self.parser.batch_names(folder) if not self.store.finished(self.solver, n)]
+            if names:
+                # all maps of a batch have the same agents and teams, one of them is enough to record the skips
+                sample = self.parser.peek(folder, names[0])
+                for n in names:
+                    self.store.append(RunRecord.skipped(self.solver, (n, sample)))
+            self.results[num_agents] = self.store.times(self.solver, cancelled=True).get(num_agents, [])
+        self._batches.clear()
+
+    def _finish_batch(self):
+        if self._current is None:
+            return
+        self.results[self._current] = self.store.times(self.solver, cancelled=True).get(self._current, [])
+        tqdm.write(f"{self.solver} on {self.suite.name} with {self._current} agents: {self.results[self._current]}")
+        self._current = None
+        self._todo = []
+
+
+def run_sweeps(sweeps: List[Sweep], processes: int = 1):
+    """
+    Runs all sweeps on one pool. Whenever a batch of a sweep is finished the next batch of that sweep is
+    queued, so workers that would idle at the end of a batch pick up maps of the other sweeps.
+    """
+    scratch_dir.mkdir(parents=True, exist_ok=True)
+    root = pathlib.Path(tempfile.mkdtemp(prefix="run-", dir=scratch_dir))
+    finished: "queue.Queue[Tuple[int, object]]" = queue.Queue()
+    jobs: Dict[int, Tuple[Sweep, Tuple[str, Problem]]] = {}
+    counter = itertools.count()
+    progress = tqdm(total=0)
+
+    try:
+        with Pool(processes, initializer=init_worker, initargs=(root,)) as p:
+            def submit(sweep: Sweep):
+                algorithm = solvers[sweep.solver]()
+                for problem in sweep.next_batch():
+                    index = next(counter)
+                    jobs[index] = sweep, problem
+                    args = (algorithm, problem, True, sweep.suite.timeout, sweep.suite.memory_limit_bytes)
+                    p.apply_async(
+                        run_claimed_problem,
+                        ((index, sweep.store.claimer(sweep.solver, sweep.owner), args),),
+                        callback=finished.put,
+                        error_callback=lambda e, index=index: finished.put((index, e)),
+                    )
+                    progress.total += 1
+                progress.refresh()
+
+            for sweep in sweeps:
+                submit(sweep)
+            while any(not sweep.done for sweep in sweeps):
+                index, result = finished.get()
+                if isinstance(result, BaseException):
+                    raise result
+                sweep, problem = jobs.pop(index)
+                sweep.record(problem, result)
+                progress.update()
+                if sweep.pending == 0:
+                    submit(sweep)
+    finally:
+        progress.close()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def run_suites(suites: List[SuiteSpec], processes: int = 1, generate: bool = True, graph: bool = True,
+               cache: Optional[ResultCache] = None, measure: Optional[str] = None):
+    if generate:
+        for suite in suites:
+            suite.generate(processes)
+
+    sweeps = [Sweep(suite, solver, cache) for suite in suites for solver in suite.solvers]
+    run_sweeps(sweeps, processes)
+
+    if graph:
+        from python.benchmarks.graph_times import graph_results
+
+        for suite in suites:
+            suite_sweeps = [sweep for sweep in sweeps if sweep.suite is suite]
+            graph_results(
+                *[(sweep.path, sweep.solver) for sweep in suite_sweeps],
+                f"{suite.name}",
+                under="number of agents",
+                save=True,
+                legend=True,
+                graph_times=measure is not None,
+                measure=measure,
+            )
+            # what the maps of the suite look like, see grid_stats
+            if suite_sweeps:
+                write_report(suite_sweeps[0].parser, suite.directory / "grid_stats.txt",
+                             range(suite.min_agents, suite.max_agents + 1))
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import pathlib
+from dataclasses import asdict, dataclass, fields
+from typing import Optional
+
+import numpy as np
+from mapfmclient import Problem
+
+from python.algorithm import MapfAlgorithm
+from python.benchmarks.grid import grid_key
+from python.benchmarks.process import RunStatus
+from python.benchmarks.results import RunRecord
+
+
+def problem_hash(problem: Problem) -> str:
+    h = hashlib.sha256(grid_key(problem.grid))
+    for locations in (problem.starts, problem.goals):
+        h.update(np.array([(m.x, m.y, m.color) for m in locations], dtype=np.int32).tobytes())
+        # separates the starts from the goals
+        h.update(b"|")
+    return h.hexdigest()
+
+
+# checksums of binaries by (path, size, mtime), so every binary is only read once per change
+_checksums: dict[tuple[str, int, int], str] = {}
+
+
+def file_checksum(path: str) -> str:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return "missing"
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    if key not in _checksums:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        _checksums[key] = h.hexdigest()
+    return _checksums[key]
+
+
+def solver_key(algorithm: MapfAlgorithm) -> str:
+    """
+    Identifies what produced a result: the solver's name and version and the checksums of its binaries.
+    """
+    h = hashlib.sha256(f"{algorithm.name}\0{algorithm.version}".encode())
+    for path in algorithm.binaries:
+        h.update(b"\0" + file_checksum(path).encode())
+    return h.hexdigest()[:16]
+
+
+@dataclass
+class CachedRun:
+    problem: str
+    solver: str
+    timeout: float
+    status: str
+    wall_time: Optional[float] = None
+    cost: Optional[int] = None
+    makespan: Optional[int] = None
+    # bytes of memory the run was limited to, None without a limit
+    memory_limit: Optional[int] = None
+    # the other measures of solved runs, see RunRecord
+    process_time: Optional[float] = None
+    solver_stats: Optional[dict] = None
+
+
+class ResultCache:
+    """
+    Results of runs by problem content, solver key, memory limit and timeout, in an append-only JSON Lines file
+    shared by all suites. Runs are only reused under the memory limit they ran with.
+
+    A solved run is reused under any timeout: within the timeout as solved, beyond it as a timeout.
+    A timeout is only reused under timeouts at most as long as the one it ran with. Runs that finished without
+    a solution are reused under timeouts at least as long, crashes and memouts
+    are never reused.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = pathlib.Path(path)
+        self._runs: dict[tuple[str, str], list[CachedRun]] = {}
+        self._offset = 0
+
+    def add(self, run: CachedRun):
+        # crashes, memouts, skipped and cancelled runs say nothing about the problem
+        if run.status not in (RunStatus.FINISHED.value, RunStatus.TIMEOUT.value):
+            return
+        with open(self.path, "a") as f:
+            f.write(json.dumps(asdict(run)) + "\n")
+
+    def add_record(self, problem: Problem, solver: str, timeout: float, record: RunRecord):
+        self.add(CachedRun(problem_hash(problem), solver, timeout, record.status, record.wall_time, record.cost,
+                           record.makespan, record.memory_limit,
+                           record.process_time if record.solved else None,
+                           record.solver_stats if record.solved else None))
+
+    def lookup(self, problem: Problem, solver: str, timeout: float,
+               memory_limit: Optional[int] = None) -> Optional[CachedRun]:
+        """
+        A cached run of problem by the solver with key solver, as it would have ended with timeout and
+        memory_limit.
+        """
+        self.refresh()
+        for run in reversed(self._runs.get((problem_hash(problem), solver), [])):
+            if run.memory_limit != memory_limit:
+                continue
+            if run.wall_time is not None:
+                if run.wall_time <= timeout:
+                    return CachedRun(run.problem, solver, timeout, run.status, run.wall_time, run.cost, run.makespan,
+                                     process_time=run.process_time, solver_stats=run.solver_stats)
+                return CachedRun(run.problem, solver, timeout, RunStatus.TIMEOUT.value)
+            if run.status == RunStatus.TIMEOUT.value and timeout <= run.timeout:
+                return CachedRun(run.problem, solver, timeout, run.status)
+            if run.status == RunStatus.FINISHED.value and timeout >= run.timeout:
+                return CachedRun(run.problem, solver, timeout, run.status)
+        return None
+
+    def refresh(self):
+        # other drivers append to the same file
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        lines = data.split(b"\n")[:-1]
+        self._offset += sum(len(line) + 1 for line in lines)
+        for line in lines:
+            try:
+                run = CachedRun(**{k: v for k, v in json.loads(line).items() if k in _run_fields})
+            except (ValueError, TypeError):
+                continue
+            self._runs.setdefault((run.problem, run.solver), []).append(run)
+
+
+_run_fields = set(field.name for field in fields(CachedRun))
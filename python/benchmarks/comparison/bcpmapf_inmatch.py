@@ -1,9 +1,9 @@
-import re
-import subprocess
-
 from mapfmclient import Problem as cProblem, Solution
 
 from python.algorithm import MapfAlgorithm
+from python.benchmarks.comparison.map_cache import write_map
+from python.benchmarks.comparison.paths import read_paths
+from python.benchmarks.process import run_solver
 
 bcp_mapf_path = "/data/BCP-paper/python/benchmarks/comparison/bcp-inmatch/bcp-inmatch"
 
@@ -14,71 +14,62 @@ class BCPSolver(MapfAlgorithm):
         map_path = "temp/" + problem.name
         num_of_agents = len(problem.starts)
 
-        types = {}
-        starts = []
-        goals = []
-        for i, start in enumerate(problem.starts):
-            x = start.x
-            y = start.y
-            c = start.color
-            start_node = "({},{})".format(x, y)
-            starts.append(start_node)
-            if not c in types: types[c] = []
-            types[c].append(i)
-        for i, goal in enumerate(problem.goals):
-            x = goal.x
-            y = goal.y
-            c = goal.color
-            goal_node = "({},{})".format(x, y)
-            goals.append((goal_node, c))
+        with self.phase("write"):
+            types = {}
+            starts = []
+            goals = []
+            for i, start in enumerate(problem.starts):
+                x = start.x
+                y = start.y
+                c = start.color
+                start_node = "({},{})".format(x, y)
+                starts.append(start_node)
+                if not c in types: types[c] = []
+                types[c].append(i)
+            for i, goal in enumerate(problem.goals):
+                x = goal.x
+                y = goal.y
+                c = goal.color
+                goal_node = "({},{})".format(x, y)
+                goals.append((goal_node, c))
 
-        scenario_path = map_path.replace(".map", ".scen")
-        with open(scenario_path, "w") as f:
-            f.write(version_info + "\n")
-            f.write(problem.name + "\n")
-            f.write("Num_of_Agents {}\n".format(num_of_agents))
-            f.write("types\n")
-            for key, val in types.items():
-                f.write("{} {}\n".format(key, " ".join([str(v) for v in val])))
-            f.write("agents starts\n")
-            for i, start in enumerate(starts):
-                f.write("{} {}\n".format(i, start))
-            f.write("goals\n")
-            for goal in goals:
-                f.write("{} {}\n".format(goal[1], goal[0]))
-            f.close()
+            scenario_path = map_path.replace(".map", ".scen")
+            with open(self.workdir / scenario_path, "w") as f:
+                f.write(version_info + "\n")
+                f.write(problem.name + "\n")
+                f.write("Num_of_Agents {}\n".format(num_of_agents))
+                f.write("types\n")
+                for key, val in types.items():
+                    f.write("{} {}\n".format(key, " ".join([str(v) for v in val])))
+                f.write("agents starts\n")
+                for i, start in enumerate(starts):
+                    f.write("{} {}\n".format(i, start))
+                f.write("goals\n")
+                for goal in goals:
+                    f.write("{} {}\n".format(goal[1], goal[0]))
+                f.close()
 
-        with open(map_path, "w") as f:
-            f.write("type octile\nheight {}\nwidth {}\nmap\n".format(problem.height, problem.width))
-            for line in problem.grid:
-                for cell in line:
-                    f.write("@" if cell else ".")
-                f.write("\n")
-            f.close()
+            write_map(self.workdir / map_path, problem)
 
-        subprocess.run([bcp_mapf_path, "-f", scenario_path], timeout=problem.timeout,
-                       stdout=subprocess.DEVNULL)  # .returncode
+        output_path = self.workdir / "outputs" / problem.name.replace(".map", ".sol")
+        output_path.unlink(missing_ok=True)
+        run_solver([bcp_mapf_path, "-f", scenario_path], self.workdir, self.deadline, self.stats, self.memory_limit)
+        if not output_path.exists():
+            return None
 
-        paths = []
-        with open("outputs/" + problem.name.replace(".map", ".sol"), "r") as f:
+        with self.phase("parse"):
+            (value, _), paths = read_paths(output_path, header_lines=2)
             try:
-                sol_val = int(f.readline())
-            except:
-                return None;
-            f.readline()
-            re_p = re.compile("(\(\d+,\d+\))")
-            while True:
-                line = f.readline()
-                if not line: break
-                path = []
-                for node in re_p.findall(line):
-                    node = node.replace("(", "").replace(")", "")
-                    x, y = node.split(",")
-                    path.append((int(x), int(y)))
-                paths.append(path)
-
-        return Solution.from_paths(paths)
+                # without a solution the first line is not its value
+                int(value)
+            except ValueError:
+                return None
+            return paths.solution()
 
     @property
     def name(self) -> str:
         return "BCP-MAPFM-Inmatch"
+
+    @property
+    def binaries(self) -> list[str]:
+        return [bcp_mapf_path]
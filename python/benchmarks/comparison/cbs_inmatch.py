@@ -1,11 +1,10 @@
-import re
-
-from mapfmclient import Problem as cProblem, Solution
-import subprocess
-
 from mapfmclient import Problem as cProblem, Solution
 
 from python.algorithm import MapfAlgorithm
+from python.benchmarks.comparison.map_cache import write_map
+from python.benchmarks.comparison.paths import read_paths
+from python.benchmarks.grid import grid_key
+from python.benchmarks.process import run_solver
 
 
 cbs_path = "/data/BCP-paper/python/benchmarks/comparison/cbs-inmatch/cbs-inmatch"
@@ -15,29 +14,25 @@ class CBSSolver(MapfAlgorithm):
     def solve(self, problem: cProblem) -> Solution:
 
         version_info = "version 1"
-        map_path = "temp/" + problem.name
+        map_path = "temp/" + grid_key(problem.grid).hex() + ".map"
         num_of_agents = len(problem.starts)
 
-        scenario_path = map_path.replace(".map", ".scen")
-        with open(scenario_path, "w") as f:
-            f.write(version_info + "\n")
-            f.write("goals\n")
-            for goal in problem.goals:
-                f.write("{}\t{}\t{}\n".format(goal.color, goal.x, goal.y))
-            f.write("agents\n")
-            for i, start in enumerate(problem.starts):
-                c = start.color
-                sx = start.x
-                sy = start.y
-                f.write(
-                    "{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\n".format(i, map_path, problem.height, problem.width, sx, sy, c, i))
-
-        with open(map_path, "w") as f:
-            f.write("type octile\nheight {}\nwidth {}\nmap\n".format(problem.height, problem.width))
-            for line in problem.grid:
-                for cell in line:
-                    f.write("@" if cell else ".")
-                f.write("\n")
+        with self.phase("write"):
+            scenario_path = "temp/" + problem.name.replace(".map", ".scen")
+            with open(self.workdir / scenario_path, "w") as f:
+                f.write(version_info + "\n")
+                f.write("goals\n")
+                for goal in problem.goals:
+                    f.write("{}\t{}\t{}\n".format(goal.color, goal.x, goal.y))
+                f.write("agents\n")
+                for i, start in enumerate(problem.starts):
+                    c = start.color
+                    sx = start.x
+                    sy = start.y
+                    f.write(
+                        "{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\n".format(i, map_path, problem.height, problem.width, sx, sy, c, i))
+
+            write_map(self.workdir / map_path, problem)
 
         args = [cbs_path, "-m", map_path]
         args += ["-a", scenario_path]
@@ -45,24 +40,20 @@ class CBSSolver(MapfAlgorithm):
         args += ["--outputPaths=paths.txt"]
         args += ["-k", str(num_of_agents)]
         # print(str(args))
-        try:
-            subprocess.run(args, timeout=problem.timeout, stdout=subprocess.DEVNULL)
-        except Exception as e:
-            print(e)
-        paths = []
-        with open("paths.txt", "r") as f:
-            re_p = re.compile("(\(\d+,\d+\))")
-            while True:
-                line = f.readline()
-                if not line: break
-                path = []
-                for node in re_p.findall(line):
-                    node = node.replace("(", "").replace(")", "")
-                    x, y = node.split(",")
-                    path.append((int(x), int(y)))
-                paths.append(path)
-        return Solution.from_paths(paths)
+        output_path = self.workdir / "paths.txt"
+        output_path.unlink(missing_ok=True)
+        run_solver(args, self.workdir, self.deadline, self.stats, self.memory_limit)
+        if not output_path.exists():
+            return None
+
+        with self.phase("parse"):
+            _, paths = read_paths(output_path)
+            return paths.solution()
 
     @property
     def name(self) -> str:
         return "CBS-MAPFM-Inmatch"
+
+    @property
+    def binaries(self) -> list[str]:
+        return [cbs_path]
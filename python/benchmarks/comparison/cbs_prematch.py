@@ -1,70 +1,68 @@
-import re
-import subprocess
-
 from mapf_branch_and_bound.bbsolver import solve_bb
 from mapfmclient import Problem as cProblem, Solution
 
 from python.algorithm import MapfAlgorithm
+from python.benchmarks.comparison.map_cache import write_map
+from python.benchmarks.comparison.paths import read_paths
+from python.benchmarks.grid import grid_key
+from python.benchmarks.process import run_solver
 
 cbs_path = "/data/BCP-paper/python/benchmarks/comparison/cbs-prematch/cbs-prematch"
 
 
 class CBSSolver(MapfAlgorithm):
     def solve(self, problem: cProblem) -> Solution:
+        # the map stays the same for every matching solve_bb tries, so it is written only once
+        self.scenario_path = "temp/" + problem.name.replace(".map", ".scen")
+        self.map_path = "temp/" + grid_key(problem.grid).hex() + ".map"
+        self.timeout = problem.timeout
+        with self.phase("write"):
+            write_map(self.workdir / self.map_path, problem)
         res = solve_bb(problem, self.solve_internal)
         return res
 
     def solve_internal(self, problem: cProblem, bound) -> Solution:
         version_info = "version 1"
-        map_path = "temp/" + problem.name
+        map_path = self.map_path
         num_of_agents = len(problem.starts)
 
-        scenario_path = map_path.replace(".map", ".scen")
-        with open(scenario_path, "w") as f:
-            f.write(version_info + "\n")
-            for i, start in enumerate(problem.starts):
-                c = start.color
-                sx = start.x
-                sy = start.y
-                for goal in problem.goals:
-                    if goal.color == c:
-                        gx = goal.x
-                        gy = goal.y
-                f.write(
-                    "{}\ttemp.map\t{}\t{}\t{}\t{}\t{}\t{}\t{}\n".format(i, problem.height, problem.width, sx, sy, gx,
-                                                                        gy, i))
-
-        with open(map_path, "w") as f:
-            f.write("type octile\nheight {}\nwidth {}\nmap\n".format(problem.height, problem.width))
-            for line in problem.grid:
-                for cell in line:
-                    f.write("@" if cell else ".")
-                f.write("\n")
+        with self.phase("write"):
+            scenario_path = self.scenario_path
+            with open(self.workdir / scenario_path, "w") as f:
+                f.write(version_info + "\n")
+                for i, start in enumerate(problem.starts):
+                    c = start.color
+                    sx = start.x
+                    sy = start.y
+                    for goal in problem.goals:
+                        if goal.color == c:
+                            gx = goal.x
+                            gy = goal.y
+                    f.write(
+                        "{}\ttemp.map\t{}\t{}\t{}\t{}\t{}\t{}\t{}\n".format(i, problem.height, problem.width, sx, sy, gx,
+                                                                            gy, i))
 
         args = [cbs_path, "-m", map_path]
         args += ["-a", scenario_path]
-        args += ["-t", str(problem.timeout * 2)]
+        args += ["-t", str(self.timeout * 2)]
         args += ["--outputPaths=paths.txt"]
         args += ["-k", str(num_of_agents)]
         if bound is not None:
             args += ["-u", str(bound)]  # + len(problem.starts)
-        subprocess.run(args, timeout=problem.timeout, stdout=subprocess.DEVNULL)
-
-        paths = []
+        output_path = self.workdir / "paths.txt"
+        output_path.unlink(missing_ok=True)
+        run_solver(args, self.workdir, self.deadline, self.stats, self.memory_limit)
+        if not output_path.exists():
+            return None
 
-        with open("paths.txt", "r") as f:
-            re_p = re.compile("(\(\d+,\d+\))")
-            while True:
-                line = f.readline()
-                if not line: break
-                path = []
-                for node in re_p.findall(line):
-                    node = node.replace("(", "").replace(")", "")
-                    x, y = node.split(",")
-                    path.append((int(x), int(y)))
-                paths.append(path)
-        return Solution.from_paths(paths)
+        with self.phase("parse"):
+            _, paths = read_paths(output_path)
+            return paths.solution()
 
     @property
     def name(self) -> str:
         return "CBS-MAPFM-Prematch"
+
+    @property
+    def binaries(self) -> list[str]:
+        return [cbs_path]
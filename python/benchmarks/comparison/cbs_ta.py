@@ -1,52 +1,84 @@
-import subprocess
+from typing import Union
 
+import numpy as np
 import yaml
 from mapfmclient import Problem as cProblem, Solution
 
 from python.algorithm import MapfAlgorithm
+from python.benchmarks.grid import as_array
+from python.benchmarks.process import run_solver
 
 cbs_ta_path = "/data/BCP-paper/python/benchmarks/comparison/cbs-ta/cbs_ta"
+# the C loader of libyaml, if pyyaml was built with it
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def read_statistics(path) -> dict:
+    """
+    The statistics section of a CBS-TA output file. Only that section is parsed, reading stops at the
+    section after it, the schedule, which holds every step of every agent.
+    """
+    section = []
+    with open(path) as f:
+        for line in f:
+            if line.startswith("statistics:"):
+                section.append(line)
+            elif section:
+                # the next top level key
+                if line.strip() and not line[0].isspace():
+                    break
+                section.append(line)
+    return yaml.load("".join(section), Loader=SafeLoader)["statistics"]
 
 
 class CBSSolver(MapfAlgorithm):
-    def solve(self, problem: cProblem) -> Solution:
+    def __init__(self, paths: bool = False):
+        # also read the schedule and return a Solution, instead of only the cost
+        self.paths = paths
+
+    def solve(self, problem: cProblem) -> Union[Solution, int]:
         map_path = "temp/" + problem.name
-        num_of_agents = len(problem.starts)
-        obstacles = []
-        for h in range(problem.height):
-            for w in range(problem.width):
-                if problem.grid[h][w] == 1:
-                    obstacles.append(list((w, h)))
-        goals = [[] for _ in range(num_of_agents)]
-        for goal in problem.goals:
-            goals[goal.color].append((goal.x, goal.y))
-        scenario_path = map_path.replace(".map", ".yaml")
-        f = open(scenario_path, 'w')
-        f.write("map:\n")
-        f.write("  dimensions: {}\n".format([problem.width, problem.height]))
-        f.write("  obstacles:\n")
-        for o in obstacles:
-            f.write("    - {}\n".format(list(o)))
-        f.write("agents:\n")
-        for i in range(num_of_agents):
-            start = [problem.starts[i].x, problem.starts[i].y]
-            goal = goals[problem.starts[i].color]
-            f.write("""  - name: agent{}
-    start: {}\n""".format(i, start))
-            f.write("    potentialGoals:\n")
-            for g in goal:
-                f.write("      - {}".format(list(g)))
-                f.write("\n")
-        f.close()
+        with self.phase("write"):
+            # every list in flow style, so the whole scenario is a single write
+            obstacles = ", ".join(f"[{x}, {y}]" for y, x in np.argwhere(as_array(problem.grid) == 1).tolist())
+            goals = {}
+            for goal in problem.goals:
+                goals.setdefault(goal.color, []).append(f"[{goal.x}, {goal.y}]")
+            lines = ["map:", f"  dimensions: [{problem.width}, {problem.height}]", f"  obstacles: [{obstacles}]",
+                     "agents:"]
+            for i, start in enumerate(problem.starts):
+                lines.append(f"  - name: agent{i}")
+                lines.append(f"    start: [{start.x}, {start.y}]")
+                lines.append(f"    potentialGoals: [{', '.join(goals[start.color])}]")
+            scenario_path = map_path.replace(".map", ".yaml")
+            with open(self.workdir / scenario_path, "w") as f:
+                f.write("\n".join(lines) + "\n")
         args = [cbs_ta_path, "-i", scenario_path, "-o", "output.yaml"]
-        try:
-            subprocess.run(args, timeout=problem.timeout, stdout=subprocess.DEVNULL)
-        except Exception as e:
-            print(e)
-        with open("output.yaml") as output_file:
-            output = yaml.safe_load(output_file)
-            return output["statistics"]["cost"]
+        output_path = self.workdir / "output.yaml"
+        output_path.unlink(missing_ok=True)
+        run_solver(args, self.workdir, self.deadline, self.stats, self.memory_limit)
+        if not output_path.exists():
+            return None
+
+        with self.phase("parse"):
+            if self.paths:
+                with open(output_path) as output_file:
+                    output = yaml.load(output_file, Loader=SafeLoader)
+                statistics = output["statistics"]
+            else:
+                statistics = read_statistics(output_path)
+            if self.stats is not None:
+                # runtime, highLevelExpanded, lowLevelExpanded, ...
+                self.stats.add_solver(statistics)
+            if self.paths:
+                return Solution.from_paths([[(step["x"], step["y"]) for step in output["schedule"][f"agent{i}"]]
+                                            for i in range(len(problem.starts))])
+            return statistics["cost"]
 
     @property
     def name(self) -> str:
         return "CBS-TA"
+
+    @property
+    def binaries(self) -> list[str]:
+        return [cbs_ta_path]
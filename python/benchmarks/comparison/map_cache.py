@@ -0,0 +1,23 @@
+import pathlib
+
+from mapfmclient import Problem
+
+from python.benchmarks.grid import grid_key, write_grid
+
+# map file -> key of the grid that was last written to it by this process
+_written: dict[pathlib.Path, bytes] = {}
+
+
+def write_map(path: pathlib.Path, problem: Problem, key: bytes = None):
+    """
+    Writes the grid of problem to path as an octile map, unless this process already wrote the same grid there.
+    """
+    if key is None:
+        key = grid_key(problem.grid)
+    if _written.get(path) == key and path.exists():
+        return
+
+    with open(path, "w") as f:
+        f.write("type octile\nheight {}\nwidth {}\nmap\n".format(problem.height, problem.width))
+        write_grid(f, problem.grid)
+    _written[path] = key
@@ -0,0 +1,73 @@
+"""
+Parser of the path output of the CBS and BCP solvers: one line per agent, holding the (x,y) of its nodes,
+e.g. "Agent 0: (1,2)->(1,3)->". The whole output is parsed at once with array operations over its bytes,
+only the lines themselves are counted in python.
+"""
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+from mapfmclient import Solution
+
+# translation table that keeps digits and turns everything else into spaces
+_digits = bytes(c if ord("0") <= c <= ord("9") else ord(" ") for c in range(256))
+
+
+@dataclass
+class Paths:
+    """
+    The paths of all agents in one array: nodes holds the (x, y) of every node, the nodes of agent i are
+    nodes[offsets[i]:offsets[i + 1]].
+    """
+    nodes: np.ndarray
+    offsets: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, agent: int) -> np.ndarray:
+        return self.nodes[self.offsets[agent]:self.offsets[agent + 1]]
+
+    def solution(self) -> Solution:
+        coordinates = iter(self.nodes.reshape(-1).tolist())
+        pairs = list(zip(coordinates, coordinates))
+        offsets = self.offsets.tolist()
+        return Solution.from_paths([pairs[start:end] for start, end in zip(offsets, offsets[1:])])
+
+
+def parse_paths(data: bytes) -> Paths:
+    """
+    The paths in data, one per line. Lines without nodes are empty paths.
+    """
+    lines = data.split(b"\n")
+    if lines[-1] == b"":
+        # the end of the last line, not an empty line
+        lines.pop()
+    offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+    np.cumsum([line.count(b"(") for line in lines], out=offsets[1:])
+    if offsets[-1] == 0:
+        return Paths(np.zeros((0, 2), dtype=np.int64), offsets)
+
+    chars = np.frombuffer(data, dtype=np.uint8)
+    # only the digits within parentheses are coordinates, not numbers like the agent's before them
+    depth = np.cumsum((chars == ord("(")).view(np.int8) - (chars == ord(")")).view(np.int8), dtype=np.int8)
+    text = np.frombuffer(data.translate(_digits), dtype=np.uint8).copy()
+    text[depth <= 0] = ord(" ")
+    nodes = np.fromstring(text.tobytes(), dtype=np.int64, sep=" ").reshape(-1, 2)
+    return Paths(nodes, offsets)
+
+
+def read_paths(path, header_lines: int = 0) -> Tuple[List[str], Paths]:
+    """
+    The first header_lines lines of the file at path, and the paths on the lines after them.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    header = []
+    start = 0
+    for _ in range(header_lines):
+        end = data.find(b"\n", start)
+        end = len(data) if end == -1 else end + 1
+        header.append(data[start:end].decode())
+        start = end
+    return header, parse_paths(data[start:])
@@ -0,0 +1,154 @@
+import os
+import pathlib
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from python.benchmarks.grid import as_array, grid_key
+
+# distance of cells that can not be reached from the source
+UNREACHABLE = -1
+# bytes of distance fields iter_distance_fields computes at once
+chunk_bytes = 64 * 1024 * 1024
+
+
+def free_cells(grid: List[List[int]]) -> np.ndarray:
+    return as_array(grid) == 0
+
+
+def distance_fields(free: np.ndarray, sources: Sequence[Tuple[int, int]]) -> np.ndarray:
+    """
+    Breadth first search distances from every (x, y) in sources to every cell of the grid.
+    All sources are searched together and every step only expands the cells of the frontier, so the time is
+    linear in the cells per source, also on mazes with long corridors.
+
+    :param free: boolean (height, width) array, True for traversable cells
+    :return: int32 array of shape (len(sources), height, width), UNREACHABLE for walls and unreachable cells
+    """
+    height, width = free.shape
+    # a wall around the grid, so neighbors never wrap to another row or another source
+    padded_width = width + 2
+    traversable = np.pad(free, 1).reshape(-1)
+    cells = traversable.size
+    neighbors = np.array([-padded_width, padded_width, -1, 1])
+
+    # distances of all sources in one flat array, cells are source * cells + cell. Walls are marked as
+    # visited, so a single lookup tells whether a cell still has to be expanded
+    wall = UNREACHABLE - 1
+    dist = np.tile(np.where(traversable, UNREACHABLE, wall).astype(np.int32), len(sources))
+    if len(sources) == 0:
+        return dist.reshape(0, height, width)
+    xs, ys = np.asarray(sources).T
+    frontier = np.arange(len(sources)) * cells + (ys + 1) * padded_width + xs + 1
+    frontier = frontier[dist[frontier] == UNREACHABLE]
+    dist[frontier] = 0
+
+    d = 0
+    while len(frontier):
+        d += 1
+        candidates = (frontier[:, None] + neighbors).reshape(-1)
+        candidates = candidates[dist[candidates] == UNREACHABLE]
+        # a cell can be the neighbor of more than one frontier cell, only the one written last is kept
+        order = np.arange(len(candidates), dtype=np.int32)
+        dist[candidates] = order
+        frontier = candidates[dist[candidates] == order]
+        dist[frontier] = d
+    dist[dist == wall] = UNREACHABLE
+    return np.ascontiguousarray(dist.reshape(len(sources), height + 2, padded_width)[:, 1:-1, 1:-1])
+
+
+def distance_field(free: np.ndarray, x: int, y: int) -> np.ndarray:
+    return distance_fields(free, [(x, y)])[0]
+
+
+def iter_distance_fields(free: np.ndarray, sources: Sequence[Tuple[int, int]],
+                         table: Optional["DistanceTable"] = None) -> Iterator[np.ndarray]:
+    """
+    The distance fields of sources one by one, computed (or taken from table) in chunks of at most chunk_bytes,
+    so that large maps with many sources do not need all their fields in memory at once.
+    """
+    size = max(1, chunk_bytes // (free.size * np.dtype(np.int32).itemsize))
+    for i in range(0, len(sources), size):
+        chunk = sources[i:i + size]
+        yield from distance_fields(free, chunk) if table is None else table.fields(chunk)
+
+
+class DistanceTable:
+    """
+    Single source distance fields of one grid, computed when they are first asked for and kept in an
+    LRU cache of at most max_bytes. Since the grid is undirected, the field of a cell also holds the
+    distances towards that cell.
+
+    With a directory, fields are also saved as <directory>/<grid hash>/<x>_<y>.npy and memory mapped
+    from there when they are needed again, also by other processes and later runs.
+    """
+
+    def __init__(self, free: np.ndarray, max_bytes: int = 64 * 1024 * 1024, directory: Optional[pathlib.Path] = None):
+        self.free = free
+        self.key = grid_key(~free).hex()
+        self.max_bytes = max_bytes
+        self.directory = None if directory is None else pathlib.Path(directory) / self.key
+        self._fields: OrderedDict[Tuple[int, int], np.ndarray] = OrderedDict()
+        self._bytes = 0
+
+    def __getitem__(self, cell: Tuple[int, int]) -> np.ndarray:
+        return self.fields([cell])[0]
+
+    def fields(self, cells: Sequence[Tuple[int, int]]) -> List[np.ndarray]:
+        """
+        The distance fields of all (x, y) in cells, the missing ones are computed in one batch.
+        """
+        found = {cell: self._lookup(cell) for cell in set(cells)}
+        missing = [cell for cell, field in found.items() if field is None]
+        for cell, field in zip(missing, distance_fields(self.free, missing)):
+            self._save(cell, field)
+            found[cell] = field
+        for cell, field in found.items():
+            self._insert(cell, field)
+        return [found[cell] for cell in cells]
+
+    def _lookup(self, cell: Tuple[int, int]) -> Optional[np.ndarray]:
+        if cell in self._fields:
+            self._fields.move_to_end(cell)
+            return self._fields[cell]
+        if self.directory is not None:
+            try:
+                return np.load(self._path(cell), mmap_mode="r")
+            except (FileNotFoundError, ValueError):
+                return None
+        return None
+
+    def _save(self, cell: Tuple[int, int], field: np.ndarray):
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # write and rename, so other processes never map a half written file
+        tmp = self.directory / f".{os.getpid()}-{cell[0]}_{cell[1]}.npy"
+        np.save(tmp, field)
+        os.replace(tmp, self._path(cell))
+
+    def _path(self, cell: Tuple[int, int]) -> pathlib.Path:
+        return self.directory / f"{cell[0]}_{cell[1]}.npy"
+
+    def _insert(self, cell: Tuple[int, int], field: np.ndarray):
+        if cell not in self._fields:
+            self._fields[cell] = field
+            self._bytes += field.nbytes
+        while self._bytes > self.max_bytes and len(self._fields) > 1:
+            _, evicted = self._fields.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+
+# distance tables of this process by grid key, see distance_table
+_tables: dict[bytes, DistanceTable] = {}
+
+
+def distance_table(grid: List[List[int]], directory: Optional[pathlib.Path] = None) -> DistanceTable:
+    """
+    The distance table of grid shared by everything in this process that works on the same grid.
+    """
+    key = grid_key(grid)
+    if key not in _tables:
+        _tables[key] = DistanceTable(free_cells(grid), directory=directory)
+    return _tables[key]
@@ -1,6 +1,8 @@
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
 
+from python.benchmarks.util import read_partial, read_times
+
 colors = [
     "#648fff",
     "#785ef0",
@@ -52,8 +54,11 @@ def graph_results(*args, under,
                   graph_times=False,
                   graph_percentage=True,
                   legend=True,
-                  limit=float("inf")
+                  limit=float("inf"),
+                  measure=None,
                   ):
+    # the rates solved come from the wall times, the times graph shows measure (the wall time if None), solvers
+    # without it are left out of the times graph
     plt.style.use('seaborn-white')
     plt.rcParams["axes.grid"] = True
 
@@ -97,67 +102,96 @@ def graph_results(*args, under,
     plt.tight_layout()
 
     longest = 65
+    # batches that were cancelled once the sweep policy decided them are marked, their rates are of the runs that happened
+    partial_label = "partial batch"
 
     for plt_index, (fn, label) in enumerate(args[:-1]):
-        with open(fn, "r") as f:
-            if graph_percentage:
-                percentagexdata = []
-                percentageydata = []
-
-            if graph_times:
-                timesxdata = []
-                times10pydata = []
-                times50pydata = []
-                times90pydata = []
-
-            lines = f.readlines()
-            first_non_solved = False
-            for l in [l.strip() for l in lines if l.strip() != ""]:
-                before, after = l.split(":")
-                after_list = eval(after)
-                num_agents = int(before)
-                if limit is not None:
-                    after_list = [x if x is None or x <= limit else None for x in after_list]
-                fraction_solved = (len(after_list) - after_list.count(None)) / len(after_list)
-                solved_times = [i for i in after_list if i is not None]
-
-                if fraction_solved == 0 and num_agents > 10 and not first_non_solved:
-                    first_non_solved = True
-                    if num_agents > longest:
-                        longest = num_agents
-
-                if fraction_solved != 0:
-                    if num_agents == 100:
-                        longest = 100
-                    if graph_percentage:
-                        percentagexdata.append(num_agents)
-                        percentageydata.append(fraction_solved * 100)
-
-                    if graph_times and len(solved_times) != 0:
-                        timesxdata.append(num_agents)
-                        times10pydata.append(percentile(solved_times, 10))
-                        times50pydata.append(percentile(solved_times, 50))
-                        times90pydata.append(percentile(solved_times, 90))
-                elif len(percentageydata) > 0 and percentageydata[-1] != 0 and graph_percentage:
+        if graph_percentage:
+            percentagexdata = []
+            percentageydata = []
+
+        if graph_times:
+            timesxdata = []
+            times10pydata = []
+            times50pydata = []
+            times90pydata = []
+
+        partial = read_partial(fn, label)
+        results = read_times(fn, label)
+        measured = results if measure in (None, "wall_time") else read_times(fn, label, measure)
+        if graph_times:
+            solved = sum(len(l) - l.count(None) for l in results.values())
+            missing = solved - sum(len(l) - l.count(None) for l in measured.values())
+            if solved and missing == solved:
+                print(f"{label} has no {measure}, it is left out of the times graph")
+            elif missing:
+                print(f"{missing} solved runs of {label} have no {measure}, they are left out of the times graph")
+
+        first_non_solved = False
+        for num_agents, after_list in sorted(results.items()):
+            if limit is not None:
+                after_list = [x if x is None or x <= limit else None for x in after_list]
+            fraction_solved = (len(after_list) - after_list.count(None)) / len(after_list)
+            solved_times = [i for i in measured.get(num_agents, []) if i is not None and (limit is None or i <= limit)]
+
+            if fraction_solved == 0 and num_agents > 10 and not first_non_solved:
+                first_non_solved = True
+                if num_agents > longest:
+                    longest = num_agents
+
+            if fraction_solved != 0:
+                if num_agents == 100:
+                    longest = 100
+                if graph_percentage:
                     percentagexdata.append(num_agents)
-                    percentageydata.append(0)
-
-            if graph_percentage:
-                percentage.plot(
-                    percentagexdata,
-                    percentageydata,
-                    linestyle=linestyles[label],
-                    color=colors[plt_index],
-                    label=labels[label],
-                    linewidth=2
+                    percentageydata.append(fraction_solved * 100)
+
+                if graph_times and len(solved_times) != 0:
+                    timesxdata.append(num_agents)
+                    times10pydata.append(percentile(solved_times, 10))
+                    times50pydata.append(percentile(solved_times, 50))
+                    times90pydata.append(percentile(solved_times, 90))
+            elif len(percentageydata) > 0 and percentageydata[-1] != 0 and graph_percentage:
+                percentagexdata.append(num_agents)
+                percentageydata.append(0)
+
+        if graph_percentage:
+            percentage.plot(
+                percentagexdata,
+                percentageydata,
+                linestyle=linestyles[label],
+                color=colors[plt_index],
+                label=labels[label],
+                linewidth=2
+            )
+            partial_points = [(x, y) for x, y in zip(percentagexdata, percentageydata) if x in partial]
+            if partial_points:
+                percentage.scatter(
+                    *zip(*partial_points),
+                    facecolors="none",
+                    edgecolors=colors[plt_index],
+                    label=partial_label,
+                    zorder=3
                 )
+                partial_label = None
+
+        if graph_times and timesxdata:
+            times.plot(
+                timesxdata,
+                times50pydata,
+                linestyle=linestyles[label],
+                color=colors[plt_index],
+                label=labels[label],
+                linewidth=2
+            )
+            times.fill_between(timesxdata, times10pydata, times90pydata, color=colors[plt_index], alpha=0.2)
     if graph_percentage:
         percentage.set_xlim(0, longest)
     else:
         times.set_xlim(0, longest + 1)
 
     if legend:
-        plt.legend(facecolor='white', framealpha=1, frameon=True, edgecolor="black", prop={'size': 10})
+        (percentage if graph_percentage else times).legend(facecolor='white', framealpha=1, frameon=True, edgecolor="black", prop={'size': 10})
     plt.show()
     if save:
         fig.savefig(f"{save_location}.png", pad_inches=0, format='png')
@@ -0,0 +1,111 @@
+"""
+Grids shared by all problems with the same layout.
+
+Every problem of a suite on a base map has the same grid, so grids are interned: equal grids are the same Grid,
+found by a hash of their content. Memory of a parsed suite then grows with its agents, not with its maps times
+their cells.
+"""
+import hashlib
+import os
+import weakref
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# interned grids by grid_key, a grid is dropped once no problem refers to it anymore
+_grids: "weakref.WeakValueDictionary[bytes, Grid]" = weakref.WeakValueDictionary()
+# base maps by (path, size, mtime), see read_grid
+_files: Dict[Tuple[str, int, int], "Grid"] = {}
+# cells write_grid converts to text at once
+chunk_cells = 1 << 20
+
+
+class Grid(list):
+    """
+    An interned grid: a list of rows in which 1 is a wall, which is what solvers index (grid[y][x] on lists is
+    much faster than on arrays). It is shared by all problems with this layout, so it must not be changed.
+    walls is the same grid as a read-only uint8 array and key its grid_key, for everything that works on
+    whole grids.
+    """
+
+    def __init__(self, walls: np.ndarray, key: bytes):
+        super().__init__(walls.tolist())
+        self.walls = walls
+        self.key = key
+
+    def __reduce__(self):
+        # interned again where it is unpickled, like in the workers that receive problems
+        return intern_grid, (self.walls,)
+
+
+def as_array(grid) -> np.ndarray:
+    """
+    grid, a Grid, a list of rows or an array, as an array.
+    """
+    return grid.walls if isinstance(grid, Grid) else np.asarray(grid)
+
+
+def grid_key(grid) -> bytes:
+    """
+    Identifies a grid, a list of rows or an array in which walls are nonzero, by its size and walls.
+    Everything that keys on grids uses this key, as .hex() where it has to be text.
+    """
+    if isinstance(grid, Grid):
+        return grid.key
+    grid = np.asarray(grid)
+    height, width = grid.shape
+    return hashlib.sha1(f"{width}x{height}".encode() + np.packbits(grid != 0).tobytes()).digest()
+
+
+def intern_grid(grid) -> Grid:
+    """
+    The interned grid equal to grid, which can be a list of rows or an array of walls.
+    """
+    array = np.ascontiguousarray(as_array(grid), dtype=np.uint8)
+    key = grid_key(array)
+    interned = _grids.get(key)
+    if interned is None:
+        # a copy, so the caller's array stays writeable
+        array = np.array(array)
+        array.flags.writeable = False
+        interned = Grid(array, key)
+        _grids[key] = interned
+    return interned
+
+
+def parse_rows(rows: List[str], width: int, height: int) -> Grid:
+    """
+    The interned grid of the rows of a map file, in which walls are "@".
+    """
+    cells = np.frombuffer("".join(row.rstrip("\r\n") for row in rows).encode(), dtype=np.uint8)
+    if cells.size != width * height:
+        raise ValueError(f"expected a {width}x{height} grid, got {cells.size} cells")
+    return intern_grid((cells == ord("@")).reshape(height, width))
+
+
+def read_grid(file) -> Grid:
+    """
+    The interned grid of a base map, a file of only rows. The file is read again only when it changed.
+    """
+    stat = os.stat(file)
+    key = (os.path.abspath(file), stat.st_size, stat.st_mtime_ns)
+    if key not in _files:
+        with open(file) as f:
+            rows = f.read().splitlines()
+        _files[key] = parse_rows(rows, max((len(row) for row in rows), default=0), len(rows))
+    return _files[key]
+
+
+def write_grid(f, grid):
+    """
+    Writes the rows of grid to the text file f as they are in map files, walls as "@" and free cells as ".".
+    Rows are converted a chunk of about chunk_cells cells at a time, so large grids are never all text at once.
+    """
+    grid = as_array(grid).astype(np.uint8, copy=False)
+    height, width = grid.shape
+    rows = max(1, chunk_cells // (width + 1))
+    for start in range(0, height, rows):
+        chunk = grid[start:start + rows]
+        chars = np.full((len(chunk), width + 1), ord("\n"), dtype=np.uint8)
+        chars[:, :width] = np.where(chunk != 0, ord("@"), ord("."))
+        f.write(chars.tobytes().decode())
@@ -0,0 +1,143 @@
+"""
+Statistics of whole grids, computed with array operations instead of per cell python loops. The generator
+checks mazes with them, and run_suites reports them per batch next to the graphs.
+
+    PYTHONPATH=. python -m python.benchmarks.grid_stats python/benchmarks/32x32_1/*/
+"""
+import os
+import sys
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from python.benchmarks.distance import free_cells
+from python.benchmarks.grid import grid_key
+
+
+@dataclass
+class GridStats:
+    width: int
+    height: int
+    traversable: int
+    traversable_fraction: float
+    components: int
+    largest_component: int
+    # traversable cells by their number of traversable neighbors
+    dead_ends: int
+    corridors: int
+    junctions: int
+    # cells (also walls) with exactly 3 traversable neighbors, what the generator checks
+    three_neighbors: int
+
+
+def neighbor_counts(free: np.ndarray) -> np.ndarray:
+    """
+    The number of traversable 4-neighbors of every cell, also of walls.
+    """
+    padded = np.pad(free, 1).astype(np.uint8)
+    return padded[:-2, 1:-1] + padded[2:, 1:-1] + padded[1:-1, :-2] + padded[1:-1, 2:]
+
+
+def connected_components(free: np.ndarray) -> Tuple[np.ndarray, int]:
+    """
+    Labels the 4-connected components of the traversable cells.
+
+    :return: the labels, 0 for walls and 1 up to the number of components for traversable cells, and that number
+    """
+    height, width = free.shape
+    # every cell starts with its own label and takes the smallest label of its neighbors until nothing changes
+    size = height * width
+    labels = np.where(free, np.arange(size).reshape(height, width), size)
+    while True:
+        padded = np.pad(labels, 1, constant_values=size)
+        smallest = np.minimum.reduce([
+            labels, padded[:-2, 1:-1], padded[2:, 1:-1], padded[1:-1, :-2], padded[1:-1, 2:]
+        ])
+        smallest = np.where(free, smallest, size)
+        # jump to the label of the label, which shortens long corridors to a logarithmic number of rounds
+        flat = smallest.ravel()
+        jumped = np.where(free, np.append(flat, size)[flat].reshape(height, width), size)
+        if np.array_equal(jumped, labels):
+            break
+        labels = jumped
+
+    roots, dense = np.unique(labels[free], return_inverse=True)
+    res = np.zeros((height, width), dtype=np.int32)
+    res[free] = dense + 1
+    return res, len(roots)
+
+
+def grid_stats(grid: List[List[int]]) -> GridStats:
+    free = free_cells(grid)
+    height, width = free.shape
+    counts = neighbor_counts(free)
+    labels, components = connected_components(free)
+    traversable = int(free.sum())
+    return GridStats(
+        width=width,
+        height=height,
+        traversable=traversable,
+        traversable_fraction=traversable / (width * height),
+        components=components,
+        largest_component=int(np.bincount(labels[free]).max()) if traversable else 0,
+        dead_ends=int((free & (counts <= 1)).sum()),
+        corridors=int((free & (counts == 2)).sum()),
+        junctions=int((free & (counts >= 3)).sum()),
+        three_neighbors=int((counts == 3).sum()),
+    )
+
+
+def average_stats(grids: Iterable) -> GridStats:
+    """
+    The average statistics of grids, as floats. Grids that occur more than once (like a base map) are
+    computed once.
+    """
+    computed: Dict[bytes, dict] = {}
+    stats = []
+    for grid in grids:
+        key = grid_key(grid)
+        if key not in computed:
+            computed[key] = asdict(grid_stats(grid))
+        stats.append(computed[key])
+    return GridStats(**{k: float(np.mean([s[k] for s in stats])) for k in stats[0]})
+
+
+def batch_stats(parser, folder: str) -> GridStats:
+    """
+    The average statistics of the maps of a batch of parser (a MapParser or SuiteParser). Maps that are only in
+    the batch's manifest are generated in memory, not written.
+    """
+    return average_stats(parser.peek(folder, name).grid for name in parser.batch_names(folder))
+
+
+report_header = f"{'batch':40} {'agents':>6} {'free':>6} {'comps':>6} {'dead':>6} {'corr':>6} {'junc':>6}\n"
+
+
+def report_line(batch: str, agents: int, s: GridStats) -> str:
+    return (f"{batch:40} {agents:6} {s.traversable_fraction:6.2f} {s.components:6.2f} {s.dead_ends:6.1f} "
+            f"{s.corridors:6.1f} {s.junctions:6.1f}\n")
+
+
+def write_report(parser, path, agents: Optional[Iterable[int]] = None):
+    """
+    Writes the average statistics of every batch of parser (a MapParser or SuiteParser) to path, one line per
+    batch. With agents only the batches with those numbers of agents, e.g. the ones of a suite.
+    """
+    agents = None if agents is None else set(agents)
+    with open(path, "w") as f:
+        f.write(report_header)
+        for num_agents, folder in parser.iter_batches():
+            if agents is None or num_agents in agents:
+                f.write(report_line(folder, num_agents, batch_stats(parser, folder)))
+
+
+if __name__ == '__main__':
+    from python.benchmarks.parse_map import MapParser
+
+    sys.stdout.write(report_header)
+    for folder in sys.argv[1:]:
+        folder = os.path.normpath(folder)
+        parser = MapParser(os.path.dirname(folder))
+        batch = os.path.basename(folder)
+        sys.stdout.write(report_line(batch, parser.batch_agents(batch), batch_stats(parser, batch)))
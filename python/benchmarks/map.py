@@ -1,23 +1,91 @@
+import hashlib
+import json
 import os
+import pathlib
 import random
+import shutil
+from dataclasses import asdict, dataclass, field
 from multiprocessing import Pool
-from numbers import Number
-from queue import Queue
-from random import randint, uniform
-from typing import List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
+import numpy as np
 from mapfmclient import Problem, MarkedLocation
 from tqdm import tqdm
 
-from python.coord import Coord
-
-processes = 12
+from python.benchmarks.distance import distance_table, free_cells
+from python.benchmarks.grid import intern_grid, read_grid, write_grid
+from python.benchmarks.grid_stats import neighbor_counts
+from python.benchmarks.placement import place_agents, placement_version
+
+# default size of the pool maps are generated with
+processes = os.cpu_count()
+# file in every batch directory that records how its maps were generated
+manifest_name = "manifest.json"
+# agent placements tried on one grid before a new maze is generated
+placement_attempts = 100
+
+
+def map_seed(seed: int, agents: int, index: int) -> int:
+    """
+    Seed of map number index of the batch with agents agents in a suite generated with seed.
+    """
+    return int.from_bytes(hashlib.sha256(f"{seed}:{agents}:{index}".encode()).digest()[:8], "little")
+
+
+@dataclass
+class BatchManifest:
+    """
+    The parameters and seeds of a generated batch, enough to generate any of its maps again.
+    """
+    seed: int
+    width: int
+    height: int
+    num_agents: List[int]
+    open_factor: float
+    max_neighbors: int
+    min_goal_distance: float
+    max_goal_distance: float
+    file: Optional[str]
+    # map name (without .map) to the seed it was generated with
+    maps: Dict[str, int] = field(default_factory=dict)
+    # map name to the GenerationStats of generating it
+    retries: Dict[str, dict] = field(default_factory=dict)
+    # how agents were placed, see placement_version, None in manifests from before placement versions
+    placement: Optional[int] = placement_version
+
+    def generate(self, name: str) -> Problem:
+        if self.placement != placement_version:
+            raise ValueError(f"{name} was placed with placement version {self.placement}, "
+                             f"only version {placement_version} can be generated again")
+        return MapGenerator(None).generate_map(self.width, self.height, self.num_agents, self.open_factor,
+                                               self.max_neighbors, self.min_goal_distance, self.max_goal_distance,
+                                               self.file, random.Random(self.maps[name]))
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(asdict(self), f, indent=2)
+
+    @classmethod
+    def load(cls, path) -> "BatchManifest":
+        with open(path) as f:
+            values = json.load(f)
+        return cls(**{"placement": None, **values})
+
+
+@dataclass
+class GenerationStats:
+    # mazes thrown away for having too few traversable cells or 3-neighbor cells
+    mazes: int = 0
+    # agent placements thrown away because a goal could not be placed
+    placements: int = 0
 
 
 class MapGenerator:
 
     def __init__(self, map_root):
         self.map_root = map_root
+        # retries of the last generate_map
+        self.stats = GenerationStats()
 
     def generate_map(self, width: int,
                      height: int,
@@ -26,38 +94,40 @@ class MapGenerator:
                      max_neighbors: int = 1,
                      min_goal_distance: float = 0.5,
                      max_goal_distance: float = 1,
-                     file=None
+                     file=None,
+                     rng: Optional[random.Random] = None,
                      ) -> Problem:
+        rng = random.Random() if rng is None else rng
+        self.stats = GenerationStats()
+        base = read_grid(file) if file else None
+        # the checks below are skipped for base maps, so make sure the agents fit at all
+        if base is not None and int(free_cells(base).sum()) < sum(num_agents):
+            raise ValueError(f"{file} has fewer traversable cells than {sum(num_agents)} agents")
         while True:
             if not file:
-                grid = self.generate_maze(width, height, open_factor=open_factor, max_neighbors=max_neighbors)
+                grid = self.generate_maze(width, height, open_factor=open_factor, max_neighbors=max_neighbors, rng=rng)
             else:
-                with open(file) as f:
-                    grid = []
-                    for line in f.read().splitlines():
-                        row = []
-                        for value in line:
-                            if value == '@':
-                                row.append(1)
-                            else:
-                                row.append(0)
-                        grid.append(row)
-            count_traversable = 0
-            for y in range(height):
-                count_traversable += width - sum(grid[y])
-            if (count_traversable < (open_factor * width * height * 0.25 * max_neighbors) or self.__num_3neighbors(
-                    grid) < sum(
-                    num_agents) - 1) and file is None:
+                grid = base
+            free = free_cells(grid)
+            if (int(free.sum()) < (open_factor * width * height * 0.25 * max_neighbors) or int(
+                    (neighbor_counts(free) == 3).sum()) < sum(num_agents) - 1) and file is None:
                 tqdm.write("Not enough traversable cells or not solvable, running again!")
+                self.stats.mazes += 1
             else:
+                # every problem generated from the same base map can reuse its distances, also in later runs
+                table = distance_table(grid, pathlib.Path(file).parent / ".distances") if file else None
                 result = None
-                while result is None:
-                    try:
-                        # connect
-                        result = self.__generate_agent_positions(grid, width, height, num_agents, min_goal_distance,
-                                                                 max_goal_distance)
-                    except:
-                        pass
+                for _ in range(placement_attempts):
+                    result = place_agents(free, sum(num_agents), min_goal_distance, max_goal_distance, rng, table)
+                    if result is not None:
+                        break
+                    self.stats.placements += 1
+                if result is None:
+                    if file:
+                        raise ValueError(f"could not place {sum(num_agents)} agents on {file}")
+                    tqdm.write("Could not place the agents, running again!")
+                    self.stats.mazes += 1
+                    continue
                 starts, goals = result
                 start_locations: List[MarkedLocation] = []
                 goal_locations: List[MarkedLocation] = []
@@ -68,7 +138,8 @@ class MapGenerator:
                         start_locations.append(MarkedLocation(color, starts[i].x, starts[i].y))
                         goal_locations.append(MarkedLocation(color, goals[i].x, goals[i].y))
                         i += 1
-                return Problem(width=width, height=height, grid=grid, starts=start_locations, goals=goal_locations)
+                return Problem(width=width, height=height, grid=intern_grid(grid), starts=start_locations,
+                               goals=goal_locations)
 
     def generate_map_file(self, name, width: int,
                           height: int,
@@ -77,10 +148,15 @@ class MapGenerator:
                           max_neighbors: int = 1,
                           min_goal_distance: float = 0.5,
                           max_goal_distance: float = 1,
-                          file=None):
+                          file=None,
+                          seed: Optional[int] = None):
         problem = self.generate_map(width, height, num_agents, open_factor, max_neighbors, min_goal_distance,
-                                    max_goal_distance, file)
-        self.__store_map(name, problem)
+                                    max_goal_distance, file, random.Random(seed))
+        self.store_map(name, problem)
+        return name, asdict(self.stats)
+
+    def generate_map_file_star(self, args):
+        return self.generate_map_file(*args)
 
     def generate_even_batch(self,
                             amount: int,
@@ -95,152 +171,163 @@ class MapGenerator:
                             max_neighbors: int = 1,
                             min_goal_distance: float = 0.5,
                             max_goal_distance: float = 1,
-                            file=None
+                            file=None,
+                            seed: int = 0,
+                            processes: int = processes,
                             ):
         package_name = package_name if package_name is not None else f"{prefix}-{width}x{height}-A{agents}_T{teams}"
+        self.__generate_batches(
+            [self.__batch(package_name, file_name, amount, width, height, agents, teams, open_factor, max_neighbors,
+                          min_goal_distance, max_goal_distance, file, seed)],
+            processes,
+        )
+
+    def generate_even_batches(self,
+                              agent_counts: Iterable[int],
+                              amount: int,
+                              width: int,
+                              height: int,
+                              teams: int,
+                              prefix="",
+                              open_factor: float = 0.75,
+                              max_neighbors: int = 1,
+                              min_goal_distance: float = 0.5,
+                              max_goal_distance: float = 1,
+                              file=None,
+                              seed: int = 0,
+                              processes: int = processes,
+                              ):
+        """
+        Generates a batch like generate_even_batch for every number of agents in agent_counts that does not
+        have one yet. All maps of all batches are generated by a single pool.
+        """
+        batches = []
+        for agents in agent_counts:
+            package_name = f"{prefix}-{width}x{height}-A{agents}_T{teams}"
+            if os.path.exists(os.path.join(self.map_root, package_name)):
+                tqdm.write(f"maps for {agents} agents already generated")
+                continue
+            batches.append(self.__batch(package_name, None, amount, width, height, agents, teams, open_factor,
+                                        max_neighbors, min_goal_distance, max_goal_distance, file, seed))
+        self.__generate_batches(batches, processes)
+
+    def regenerate_map(self, package_name: str, name: str) -> Problem:
+        """
+        Generates map name of the batch in package_name again from the batch's manifest.
+        """
+        return BatchManifest.load(os.path.join(self.map_root, package_name, manifest_name)).generate(name)
+
+    def restore_batch(self, package_name: str, names: Optional[List[str]] = None):
+        """
+        Writes the maps of the batch in package_name that are listed in its manifest but missing on disk,
+        so only manifests have to be copied between machines. With names (file names, with .map) only those.
+        """
+        manifest = BatchManifest.load(os.path.join(self.map_root, package_name, manifest_name))
+        for name in manifest.maps if names is None else [n[:-len(".map")] for n in names if n.endswith(".map")]:
+            if name in manifest.maps and not os.path.exists(os.path.join(self.map_root, package_name, name + ".map")):
+                self.store_map(os.path.join(package_name, name), manifest.generate(name))
+
+    def __batch(self, package_name: str, file_name: Optional[str], amount: int, width: int, height: int, agents: int,
+                teams: int, open_factor: float, max_neighbors: int, min_goal_distance: float,
+                max_goal_distance: float, file, seed: int) -> Tuple[str, BatchManifest, list]:
         file_name = package_name if file_name is None else file_name
         min_team_count = int(agents / teams)
         diff = agents - (min_team_count * teams)
         num_agents = [min_team_count for _ in range(teams)]
-        os.mkdir(os.path.join(self.map_root, package_name))
         for i in range(diff):
             num_agents[i] += 1
 
+        manifest = BatchManifest(seed, width, height, num_agents, open_factor, max_neighbors, min_goal_distance,
+                                 max_goal_distance, file)
         actions = []
-        for i in range(amount):
+        for index in range(amount):
+            i = index
             if i < 10 < amount:
                 i = f"0{i}"
             if int(i) < 100 < amount:
                 i = f"0{i}"
-            name = os.path.join(package_name, f"{file_name}-{i}")
+            # maps are written to a temporary directory that is renamed once the whole batch is done
+            name = os.path.join(self.__temporary(package_name), f"{file_name}-{i}")
+            manifest.maps[f"{file_name}-{i}"] = map_seed(seed, agents, index)
             actions.append((name, width, height, num_agents, open_factor, max_neighbors, min_goal_distance,
-                            max_goal_distance, file))
-
+                            max_goal_distance, file, manifest.maps[f"{file_name}-{i}"]))
+        return package_name, manifest, actions
+
+    def __generate_batches(self, batches: List[Tuple[str, BatchManifest, list]], processes: int):
+        remaining = {}
+        for package_name, manifest, actions in batches:
+            temporary = os.path.join(self.map_root, self.__temporary(package_name))
+            # left over from an interrupted run
+            shutil.rmtree(temporary, ignore_errors=True)
+            os.mkdir(temporary)
+            manifest.save(os.path.join(temporary, manifest_name))
+            remaining[package_name] = len(actions)
+        manifests = {package_name: manifest for package_name, manifest, _ in batches}
+
+        actions = [action for _, _, action_list in batches for action in action_list]
         with Pool(processes) as p:
-            p.starmap(self.generate_map_file, actions)
-
-    def __generate_agent_positions(self, grid, width, height, num_agents: List[int],
-                                   min_distance: float,
-                                   max_distance: float) -> Tuple[List[Coord], List[Coord]]:
-        agent_positions = []
-        goal_positions = []
-
-        # Find a random position for each agent
-        for x in range(sum(num_agents)):
-            start_x = randint(0, width - 1)
-            start_y = randint(0, height - 1)
-            while grid[start_y][start_x] != 0 or Coord(start_x, start_y) in agent_positions:
-                start_x = randint(0, width - 1)
-                start_y = randint(0, height - 1)
-
-            agent_positions.append(Coord(start_x, start_y))
-
-        for agent in agent_positions:
-            queue = Queue()
-            queue.put((agent, 0))
-            distances, m = self.__compute_heuristic(queue, grid)
-            distance = random.randint(int(m * min_distance), int(m * max_distance))
-            possible_locations = []
-            for y, row in enumerate(distances):
-                for x, value in enumerate(row):
-                    if value == distance and Coord(x, y) not in goal_positions:
-                        possible_locations.append(Coord(x, y))
-
-            goal_positions.append(random.choice(possible_locations))
-
-        return agent_positions, goal_positions
-
-    @staticmethod
-    def __num_3neighbors(grid: List[List[int]]) -> int:
-        height = len(grid)
-        width = len(grid[0])
-        res = 0
-        for y in range(height):
-            for x in range(width):
-                count = 0
-                for ndx, ndy in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
-                    neighbor_x = x + ndx
-                    neighbor_y = y + ndy
-                    if 0 <= neighbor_x < width and 0 <= neighbor_y < height and grid[neighbor_y][neighbor_x] == 0:
-                        count += 1
-                if count == 3:
-                    res += 1
-        return res
-
-    def __compute_heuristic(self, queue: Queue, grid: List[List[int]]) -> Tuple[List[List[Number]], int]:
-        visited = set()
-        heuristic = [[float('inf') for _ in range(len(grid[0]))] for _ in range(len(grid))]
-        m = 0
-        while not queue.empty():
-            coord, dist = queue.get()
-            m = max(dist, m)
-            if coord in visited:
-                continue
-            visited.add(coord)
-
-            # Already has a better distance
-            if heuristic[coord.y][coord.x] != float("inf"):
-                continue
-            heuristic[coord.y][coord.x] = dist
-
-            for neighbor in self.__get_neighbors(grid, coord):
-                if neighbor not in visited:
-                    queue.put((neighbor, dist + 1))
-        return heuristic, m
+            for name, stats in tqdm(p.imap_unordered(self.generate_map_file_star, actions), total=len(actions)):
+                package_name = os.path.dirname(name)[len(".tmp-"):]
+                manifests[package_name].retries[os.path.basename(name)] = stats
+                remaining[package_name] -= 1
+                if remaining[package_name] == 0:
+                    manifests[package_name].save(os.path.join(self.map_root, self.__temporary(package_name),
+                                                              manifest_name))
+                    os.rename(os.path.join(self.map_root, self.__temporary(package_name)),
+                              os.path.join(self.map_root, package_name))
 
     @staticmethod
-    def __get_neighbors(grid: List[List[int]], coords: Coord):
-        res = list()
-        for dx, dy in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
-            new_coord = coords + Coord(dx, dy)
-            if 0 <= new_coord.y < len(grid) and 0 <= new_coord.x < len(grid[0]) and grid[new_coord.y][new_coord.x] == 0:
-                res.append(new_coord)
-        return res
+    def __temporary(package_name: str) -> str:
+        return f".tmp-{package_name}"
 
     @staticmethod
-    def generate_maze(width: int, height: int, open_factor: float, max_neighbors: int) -> List[List[int]]:
-        grid: List[List[int]] = []
-        for x in range(height):
-            grid.append([1] * width)
-
-        start_x = randint(0, width - 1)
-        start_y = randint(0, height - 1)
-
-        grid[start_y][start_x] = 0
-
-        frontier = [Coord(start_x, start_y)]
-
+    def generate_maze(width: int, height: int, open_factor: float, max_neighbors: int,
+                      rng: Optional[random.Random] = None) -> np.ndarray:
+        rng = random.Random() if rng is None else rng
+        # flat arrays with a border around the grid, so neighbors need no bounds checks.
+        # closed is 1 for the walls of the grid that can still be opened, 0 for open cells and the border
+        padded_width = width + 2
+        closed = bytearray(padded_width * (height + 2))
+        for y in range(1, height + 1):
+            closed[y * padded_width + 1:y * padded_width + width + 1] = b"\x01" * width
+        # number of open neighbors of every cell, updated whenever a cell is opened
+        open_neighbors = bytearray(len(closed))
+        steps = (-padded_width, padded_width, -1, 1)
+
+        start_x = rng.randint(0, width - 1)
+        start_y = rng.randint(0, height - 1)
+
+        def open_cell(cell: int):
+            closed[cell] = 0
+            for step in steps:
+                open_neighbors[cell + step] += 1
+
+        start = (start_y + 1) * padded_width + start_x + 1
+        open_cell(start)
+        frontier = [start]
+        uniform = rng.random
         while frontier:
-            pos = frontier.pop()
-            for dx, dy in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
-                if uniform(0, 1) < open_factor:
-                    new_x = pos.x + dx
-                    new_y = pos.y + dy
-
-                    # Check if not out of bounds and if not already opened
-                    if 0 <= new_x < width and 0 <= new_y < height and grid[new_y][new_x] != 0:
-                        # Check number of open neighbors
-                        count = 0
-                        for ndx, ndy in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
-                            neighbor_x = new_x + ndx
-                            neighbor_y = new_y + ndy
-                            if 0 <= neighbor_x < width and 0 <= neighbor_y < height and grid[neighbor_y][
-                                neighbor_x] == 0:
-                                count += 1
-                        if count <= max_neighbors:
-                            grid[new_y][new_x] = 0
-                            frontier.append(Coord(new_x, new_y))
-        return grid
-
-    def __store_map(self, name: str, problem: Problem):
+            cell = frontier.pop()
+            for step in steps:
+                # rng.uniform(0, 1), drawn for every direction so mazes stay the same for a seed
+                if uniform() < open_factor:
+                    new = cell + step
+                    if closed[new] and open_neighbors[new] <= max_neighbors:
+                        open_cell(new)
+                        frontier.append(new)
+        grid = np.frombuffer(bytes(closed), dtype=np.uint8).reshape(height + 2, padded_width)
+        return np.ascontiguousarray(grid[1:-1, 1:-1])
+
+    def store_map(self, name: str, problem: Problem):
         file_path = os.path.join(self.map_root, name + ".map")
-        with open(file_path, 'w') as f:
+        # write and rename, so drivers sharing the directory never parse a half written map
+        tmp = os.path.join(os.path.dirname(file_path), f".{os.getpid()}-{os.path.basename(file_path)}.tmp")
+        with open(tmp, 'w') as f:
             f.write(f'width {problem.width}\n')
             f.write(f'height {problem.height}\n')
 
             # Grid
-            for row in problem.grid:
-                f.write(''.join(map(lambda x: '.' if x == 0 else '@', row)) + "\n")
+            write_grid(f, problem.grid)
 
             # Number of agents
             f.write(f'{len(problem.starts)}\n')
@@ -251,3 +338,4 @@ class MapGenerator:
 
             for goal in problem.goals:
                 f.write(f'{goal.x} {goal.y} {goal.color}\n')
+        os.replace(tmp, file_path)
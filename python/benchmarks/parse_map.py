@@ -1,8 +1,11 @@
 import os.path
-from typing import Tuple, List
+from typing import Iterator, List, Optional, Tuple
 
 from mapfmclient import MarkedLocation, Problem
 
+from python.benchmarks.grid import parse_rows
+from python.benchmarks.map import BatchManifest, MapGenerator, manifest_name
+
 
 class MapParser:
     def __init__(self, map_root):
@@ -19,9 +22,8 @@ class MapParser:
         height_line = list(lines[1].split(" "))
         width = int(width_line[1])
         height = int(height_line[1])
-        grid = []
-        for i in range(height):
-            grid.append([int(c == "@") for c in lines[2 + i] if c != "\n"])
+        # maps of the same layout share one grid
+        grid = parse_rows(lines[2:2 + height], width, height)
         agents = int(lines[2 + height])
         starts = []
         starting_line = 3 + height
@@ -44,8 +46,60 @@ class MapParser:
             goals.append(MarkedLocation(color, x, y))
         return Problem(grid, width, height, starts, goals)
 
-    def parse_batch(self, folder) -> List[Tuple[str, Problem]]:
-        paths = os.listdir(os.path.join(self.map_root, folder))
-        return [(str(path), self.parse_map(str(os.path.join(folder, path)))) for path in paths]
+    def agent_count(self, location: str) -> int:
+        """
+        The number of agents of a map, reading only the lines up to it.
+        """
+        path = os.path.join(self.map_root, location if location.endswith(".map") else location + ".map")
+        with open(path) as f:
+            f.readline()
+            height = int(f.readline().split(" ")[1])
+            for _ in range(height):
+                f.readline()
+            return int(f.readline())
+
+    def batch_names(self, folder) -> List[str]:
+        """
+        The names of the maps of a batch, from its manifest if it has one, so also the maps not written yet.
+        """
+        manifest = os.path.join(self.map_root, folder, manifest_name)
+        if os.path.exists(manifest):
+            return sorted(name + ".map" for name in BatchManifest.load(manifest).maps)
+        return sorted(path for path in os.listdir(os.path.join(self.map_root, folder)) if path.endswith(".map"))
+
+    def parse_batch(self, folder, names: Optional[List[str]] = None) -> List[Tuple[str, Problem]]:
+        names = self.batch_names(folder) if names is None else names
+        if os.path.exists(os.path.join(self.map_root, folder, manifest_name)):
+            # maps that were not copied along with the manifest are generated again, only once they are needed
+            MapGenerator(self.map_root).restore_batch(folder, names)
+        return [(str(name), self.parse_map(str(os.path.join(folder, name)))) for name in names]
+
+    def peek(self, folder, name: str) -> Problem:
+        """
+        Map name of a batch without writing it: parsed if it is on disk, otherwise generated in memory from the
+        batch's manifest.
+        """
+        if os.path.exists(os.path.join(self.map_root, folder, name)):
+            return self.parse_map(os.path.join(folder, name))
+        return MapGenerator(self.map_root).regenerate_map(folder, name[:-len(".map")])
 
+    def batch_agents(self, folder) -> int:
+        manifest = os.path.join(self.map_root, folder, manifest_name)
+        if os.path.exists(manifest):
+            return sum(BatchManifest.load(manifest).num_agents)
+        return self.agent_count(os.path.join(folder, self.batch_names(folder)[0]))
 
+    def iter_batches(self) -> Iterator[Tuple[int, str]]:
+        """
+        The (number of agents, folder) of every batch under map_root, ordered by the number of agents.
+        Only the manifest or the header of one map per batch is read, the batches themselves are parsed (and
+        their missing maps generated) by parse_batch when needed.
+        """
+        batches = []
+        for folder in os.listdir(self.map_root):
+            # hidden folders are batches that are still being generated
+            if folder.startswith(".") or not os.path.isdir(os.path.join(self.map_root, folder)):
+                continue
+            if self.batch_names(folder):
+                batches.append((self.batch_agents(folder), folder))
+        return iter(sorted(batches))
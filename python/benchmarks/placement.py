@@ -0,0 +1,73 @@
+"""
+Placement of agents on a grid: starts are sampled without replacement from an index of the free cells, goals
+from the cells of each start's distance field bucketed by distance, skipping the cells that already are a goal.
+Apart from computing the distance fields, the work per agent does not depend on the number of agents.
+"""
+import random
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+
+from python.benchmarks.distance import DistanceTable, iter_distance_fields
+from python.coord import Coord, unpack
+
+# version of the placement, recorded in batch manifests so their maps can be generated again exactly
+placement_version = 1
+
+
+class DistanceBuckets:
+    """
+    The cells of one distance field by their distance, and how many of them are still available.
+    """
+
+    def __init__(self, field: np.ndarray, taken: List[int]):
+        self.field = field.reshape(-1)
+        # shifted by one, so that the unreachable cells (UNREACHABLE is -1) are counted first and dropped
+        self.available = np.bincount(self.field + 1)[1:]
+        # only the cells that already are a goal are looked up, not the whole field
+        if taken:
+            self.available -= np.bincount(self.field[taken] + 1, minlength=len(self.available) + 1)[1:]
+
+    @property
+    def max_distance(self) -> int:
+        return len(self.available) - 1
+
+    def feasible(self, low: int, high: int) -> np.ndarray:
+        return np.flatnonzero(self.available[low:high + 1]) + low
+
+    def choose(self, distance: int, taken: Set[int], rng: random.Random) -> int:
+        bucket = np.flatnonzero(self.field == distance)
+        # at least one cell of the bucket is available, and usually most are
+        while True:
+            cell = int(bucket[rng.randrange(len(bucket))])
+            if cell not in taken:
+                return cell
+
+
+def place_agents(free: np.ndarray, count: int, min_distance: float, max_distance: float, rng: random.Random,
+                 table: Optional[DistanceTable] = None) -> Optional[Tuple[List[Coord], List[Coord]]]:
+    """
+    Starts and goals of count agents on the free cells, every goal at a distance from its start between
+    min_distance and max_distance times the largest distance reachable from that start.
+    Returns None if the goal of some agent could not be placed.
+    """
+    height, width = free.shape
+    cells = np.flatnonzero(free)
+    if len(cells) < count:
+        return None
+    starts = [unpack(int(cells[i]), width) for i in rng.sample(range(len(cells)), count)]
+
+    goals: List[int] = []
+    taken: Set[int] = set()
+    for field in iter_distance_fields(free, starts, table):
+        buckets = DistanceBuckets(field, goals)
+        m = buckets.max_distance
+        low = int(m * min_distance)
+        feasible = buckets.feasible(low, int(m * max_distance))
+        if len(feasible) == 0:
+            return None
+        goal = buckets.choose(int(rng.choice(feasible)), taken, rng)
+        goals.append(goal)
+        taken.add(goal)
+
+    return [Coord(x, y) for x, y in starts], [Coord(*unpack(goal, width)) for goal in goals]
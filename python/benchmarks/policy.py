@@ -0,0 +1,126 @@
+import math
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+# (wall times, None if not solved or cancelled) of the maps of a batch per number of agents
+Results = Dict[int, List[Optional[float]]]
+
+
+def solved(times: List[Optional[float]]) -> int:
+    return sum(1 for t in times if t is not None)
+
+
+class SweepPolicy(ABC):
+    """
+    Decides which batches of a sweep are run, and when the rest of a running batch can be cancelled.
+    """
+
+    @abstractmethod
+    def next(self, remaining: List[int], results: Results, maps: int) -> Optional[int]:
+        """
+        The number of agents of the batch to run next out of remaining (in increasing order), or None to skip
+        all remaining batches. results holds the batches run so far, maps is the number of maps per batch.
+        """
+        raise NotImplementedError()
+
+    def decided(self, outcomes: List[bool], total: int) -> bool:
+        """
+        Whether the maps of the running batch that did not finish yet can be cancelled,
+        given whether each of the finished maps was solved.
+        """
+        return False
+
+
+class ZeroSuccess(SweepPolicy):
+    """
+    Runs batches in order until one is not solved at all.
+    """
+
+    def next(self, remaining: List[int], results: Results, maps: int) -> Optional[int]:
+        num_agents = remaining[0]
+        previous = results.get(num_agents - 1, [])
+        # keep going while fewer agents were solved at least once, or are still being run by another driver
+        if num_agents <= 2 or solved(previous) != 0 or len(previous) < maps:
+            return num_agents
+        return None
+
+
+class SuccessThreshold(SweepPolicy):
+    """
+    Runs batches in order until the fraction solved of one drops below threshold, and cancels a batch as soon
+    as it can no longer reach the threshold. With a confidence (a z-score, e.g. 1.64 for 95%) a batch is also
+    cancelled when the upper confidence bound of its success rate is below the threshold.
+    """
+
+    def __init__(self, threshold: float = 0.05, confidence: Optional[float] = None, min_runs: int = 5):
+        self.threshold = threshold
+        self.confidence = confidence
+        self.min_runs = min_runs
+
+    def next(self, remaining: List[int], results: Results, maps: int) -> Optional[int]:
+        num_agents = remaining[0]
+        previous = results.get(num_agents - 1)
+        if previous is None or len(previous) < maps or solved(previous) >= self.threshold * len(previous):
+            return num_agents
+        return None
+
+    def decided(self, outcomes: List[bool], total: int) -> bool:
+        successes = sum(outcomes)
+        if successes + total - len(outcomes) < self.threshold * total:
+            return True
+        if self.confidence is None or len(outcomes) < self.min_runs or successes >= self.threshold * total:
+            return False
+        return wilson_upper(successes, len(outcomes), self.confidence) < self.threshold
+
+
+class Bisection(SweepPolicy):
+    """
+    Binary search for the smallest number of agents of which less than target is solved, assuming the
+    fraction solved only decreases with more agents. Batches are cancelled as soon as it is known on
+    which side of target they end up.
+    """
+
+    def __init__(self, target: float = 0.5):
+        self.target = target
+
+    def bounds(self, results: Results, maps: int) -> tuple[Optional[int], Optional[int]]:
+        # most agents known to be solved at least target, fewest agents known to be solved less than target
+        low = high = None
+        for num_agents, times in results.items():
+            if solved(times) >= self.target * maps:
+                low = num_agents if low is None else max(low, num_agents)
+            elif solved(times) + maps - len(times) < self.target * maps:
+                high = num_agents if high is None else min(high, num_agents)
+        return low, high
+
+    def next(self, remaining: List[int], results: Results, maps: int) -> Optional[int]:
+        low, high = self.bounds(results, maps)
+        candidates = [n for n in remaining if (low is None or n > low) and (high is None or n < high)]
+        if not candidates:
+            return None
+        return candidates[len(candidates) // 2]
+
+    def decided(self, outcomes: List[bool], total: int) -> bool:
+        successes = sum(outcomes)
+        return successes >= self.target * total or successes + total - len(outcomes) < self.target * total
+
+
+def wilson_upper(successes: int, runs: int, z: float) -> float:
+    p = successes / runs
+    center = p + z * z / (2 * runs)
+    margin = z * math.sqrt(p * (1 - p) / runs + z * z / (4 * runs * runs))
+    return (center + margin) / (1 + z * z / runs)
+
+
+def make_policy(spec: str) -> SweepPolicy:
+    """
+    A policy from its name and optional arguments: "zero", "threshold[:THRESHOLD[:Z]]" or "bisect[:TARGET]".
+    """
+    name, *args = spec.split(":")
+    if name == "zero":
+        return ZeroSuccess()
+    if name == "threshold":
+        return SuccessThreshold(*(float(a) for a in args))
+    if name == "bisect":
+        return Bisection(*(float(a) for a in args))
+    raise ValueError(f"unknown sweep policy {spec}")
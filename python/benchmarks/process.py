@@ -0,0 +1,239 @@
+import os
+import pathlib
+import resource
+import select
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from enum import Enum
+from typing import Optional, Tuple
+
+from python.benchmarks.stats import RunStats
+
+# seconds a solver gets to exit after SIGTERM before its process group is killed
+kill_grace = 1.0
+# seconds between checks of the memory of a running solver, see wait
+memory_poll = 0.05
+# what solvers print to stderr when an allocation fails
+oom_messages = (b"bad_alloc", b"out of memory", b"Cannot allocate memory", b"memory allocation of", b"MemoryError",
+                b"failed to map segment")
+
+
+class RunStatus(str, Enum):
+    FINISHED = "finished"
+    TIMEOUT = "timeout"
+    CRASHED = "crashed"
+    MEMOUT = "memout"
+
+
+class SolverTimeout(Exception):
+    pass
+
+
+class SolverCrashed(Exception):
+    pass
+
+
+class SolverMemout(Exception):
+    pass
+
+
+def run_solver(args: list[str], cwd: pathlib.Path, deadline: Optional[float] = None,
+               stats: Optional[RunStats] = None, memory_limit: Optional[int] = None) -> int:
+    """
+    Runs a solver binary in its own process group and waits for it until deadline (a time.monotonic() value).
+    When the deadline passes the whole group gets SIGTERM and, if it does not exit within kill_grace, SIGKILL.
+
+    With stats, the time to start the solver and to wait for it, and its peak RSS, are added to it.
+
+    With a memory_limit (in bytes) the solver's address space is limited to it with RLIMIT_AS, and it is
+    stopped as soon as its resident memory exceeds it. A solver that fails to allocate under the limit
+    (and says so on stderr) or is killed by the kernel's OOM killer counts as out of memory too.
+
+    :raises SolverTimeout: when the deadline passed
+    :raises SolverMemout: when the solver ran out of memory
+    :raises SolverCrashed: when the solver was terminated by a signal we did not send
+    """
+    timeout = None
+    if deadline is not None:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            raise SolverTimeout()
+
+    # the alarm of the run only goes off while waiting for the solver, so the solver is always started and
+    # stopped and its files closed as a whole, see alarm
+    with alarms_blocked():
+        stderr = None if memory_limit is None else tempfile.TemporaryFile()
+        start = time.perf_counter_ns()
+        proc = subprocess.Popen(args, cwd=cwd, stdout=subprocess.DEVNULL, stderr=stderr, start_new_session=True,
+                                preexec_fn=lambda: setup_child(memory_limit))
+        spawned = time.perf_counter_ns()
+        try:
+            returncode = wait(proc, timeout, stats, memory_limit)
+        except subprocess.TimeoutExpired:
+            stop(proc)
+            raise SolverTimeout()
+        except BaseException:
+            stop(proc)
+            raise
+
+        finally:
+            if stats is not None:
+                stats.add_phase("spawn", spawned - start)
+                stats.add_phase("wait", time.perf_counter_ns() - spawned)
+                stats.solver_calls += 1
+            if stderr is not None:
+                stderr.seek(0)
+                output = stderr.read()
+                stderr.close()
+                # the output is only captured to look for failed allocations, it is passed on as usual
+                sys.stderr.write(output.decode(errors="replace"))
+
+    if memory_limit is not None and returncode != 0:
+        if returncode == -signal.SIGKILL or any(message in output for message in oom_messages):
+            raise SolverMemout(f"{args[0]} ran out of memory with exit code {returncode}")
+    if returncode < 0:
+        raise SolverCrashed(f"{args[0]} terminated by signal {signal.Signals(-returncode).name}")
+    return returncode
+
+
+@contextmanager
+def alarm(timeout: float):
+    """
+    Raises SolverTimeout in the main thread once timeout seconds passed, also in the middle of python work
+    between solver calls, like the cost matrix and subproblems of solve_bb. Does nothing in other threads,
+    which can not receive signals. run_solver holds the alarm back except while it waits for the solver.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def expired(signum, frame):
+        raise SolverTimeout()
+
+    previous = signal.signal(signal.SIGALRM, expired)
+    signal.setitimer(signal.ITIMER_REAL, max(timeout, 1e-6))
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+@contextmanager
+def alarms_blocked():
+    """
+    Holds back SIGALRM in the main thread, an alarm that goes off meanwhile is raised when the block ends.
+    """
+    blocked = signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+    try:
+        yield
+    finally:
+        signal.pthread_sigmask(signal.SIG_SETMASK, blocked)
+
+
+@contextmanager
+def alarms_allowed():
+    # within alarms_blocked, the parts that may be interrupted
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGALRM})
+    try:
+        yield
+    finally:
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+
+
+def setup_child(memory_limit: Optional[int]):
+    # runs in the child between fork and exec, the solver gets the signal mask of before run_solver
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGALRM})
+    if memory_limit is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+
+def memory_usage(pid: int) -> Optional[Tuple[int, int]]:
+    """
+    The resident memory of a process and its peak (VmRSS and VmHWM), in bytes.
+    """
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    # in kB
+                    usage[line[:5]] = int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    # an exited process that was not reaped yet has no memory left
+    if len(usage) < 2:
+        return None
+    return usage["VmRSS"], usage["VmHWM"]
+
+
+def wait(proc: subprocess.Popen, timeout: Optional[float], stats: Optional[RunStats] = None,
+         memory_limit: Optional[int] = None) -> int:
+    """
+    proc.wait(timeout), checking the memory of the child every memory_poll seconds: its peak RSS is added to
+    stats, and with a memory_limit it is stopped as soon as its resident memory exceeds the limit.
+
+    The peak is the VmHWM of the child, which starts over at exec. It is sampled, so growth in the last
+    memory_poll seconds before the child exits is missed. The ru_maxrss of wait4 is not used because on linux
+    it keeps the peak of before exec, the RSS of the python process the child was forked from.
+
+    :raises SolverMemout: when the resident memory of the child exceeded memory_limit
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    poll = stats is not None or memory_limit is not None
+    # the pidfd becomes readable when the child exits, without the sleeps of proc.wait(timeout)
+    pidfd = os.pidfd_open(proc.pid) if poll and hasattr(os, "pidfd_open") else None
+    peak = None
+    try:
+        while True:
+            interval = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if poll:
+                interval = memory_poll if interval is None else min(interval, memory_poll)
+            if pidfd is None:
+                try:
+                    with alarms_allowed():
+                        return proc.wait(interval)
+                except subprocess.TimeoutExpired:
+                    pass
+            else:
+                with alarms_allowed():
+                    exited = select.select([pidfd], [], [], interval)[0]
+                if exited:
+                    return proc.wait()
+
+            if deadline is not None and time.monotonic() >= deadline:
+                raise subprocess.TimeoutExpired(proc.args, timeout)
+            usage = memory_usage(proc.pid) if poll else None
+            if usage is None:
+                continue
+            rss, peak = usage
+            if memory_limit is not None and rss > memory_limit:
+                raise SolverMemout(f"{proc.args[0]} exceeded {memory_limit} bytes of resident memory")
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
+        if stats is not None and peak is not None:
+            stats.add_rss(peak)
+
+
+def stop(proc: subprocess.Popen):
+    # an alarm going off now would leave the solver running, it is raised once the solver is gone
+    with alarms_blocked():
+        kill_group(proc.pid, signal.SIGTERM)
+        try:
+            proc.wait(kill_grace)
+        except subprocess.TimeoutExpired:
+            kill_group(proc.pid, signal.SIGKILL)
+            proc.wait()
+
+
+def kill_group(pgid: int, sig: signal.Signals):
+    try:
+        os.killpg(pgid, sig)
+    except ProcessLookupError:
+        pass
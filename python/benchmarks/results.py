@@ -0,0 +1,286 @@
+import fcntl
+import json
+import os
+import pathlib
+import socket
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, fields
+from functools import partial
+from typing import Callable, Optional, Union
+
+from mapfmclient import Problem, Solution
+
+from python.benchmarks.process import RunStatus
+from python.benchmarks.stats import RunStats
+
+# status of the runs the driver did not attempt because the sweep policy skipped their batch
+SKIPPED = "skipped"
+# status of the runs that were not needed anymore once the sweep policy had decided about their batch
+CANCELLED = "cancelled"
+# memory limit of stores that count the records made under any memory limit, see ResultStore
+ANY_LIMIT = -1
+
+
+@dataclass
+class RunRecord:
+    solver: str
+    map: str
+    agents: int
+    teams: int
+    status: str
+    wall_time: Optional[float] = None
+    cost: Optional[int] = None
+    makespan: Optional[int] = None
+    # timeout and solver key (see cache.solver_key) the run was made with, None in older stores
+    timeout: Optional[float] = None
+    key: Optional[str] = None
+    # seconds from starting until the exit of the solver processes, without writing their input and parsing
+    # their output
+    process_time: Optional[float] = None
+    # largest peak RSS of the solver processes in bytes
+    peak_rss: Optional[int] = None
+    # nanoseconds per phase and the solver's own statistics, see RunStats
+    phases: Optional[dict] = None
+    solver_stats: Optional[dict] = None
+    # bytes of memory the solver processes were limited to, None without a limit
+    memory_limit: Optional[int] = None
+    # sweep policy (see policy.make_policy) that skipped or cancelled the run
+    policy: Optional[str] = None
+
+    @property
+    def solved(self) -> bool:
+        return self.wall_time is not None
+
+    @property
+    def solver_time(self) -> Optional[float]:
+        # the runtime the solver reported, for solvers that report it
+        return None if not self.solver_stats else self.solver_stats.get("runtime")
+
+    @classmethod
+    def from_run(cls, solver: str, problem: tuple[str, Problem],
+                 result: tuple[Optional[float], Union[Solution, int, None], RunStatus, RunStats],
+                 memory_limit: Optional[int] = None) -> "RunRecord":
+        wall_time, sol, status, stats = result
+        cost, makespan = solution_cost(sol)
+        process_time = None
+        if "wait" in stats.phases:
+            process_time = (stats.phases["wait"] + stats.phases.get("spawn", 0)) / 1e9
+        return cls(solver, problem[0], len(problem[1].starts), num_teams(problem[1]), str(status.value), wall_time,
+                   cost, makespan, process_time=process_time, peak_rss=stats.peak_rss, phases=stats.phases or None,
+                   solver_stats=stats.solver or None, memory_limit=memory_limit)
+
+    @classmethod
+    def skipped(cls, solver: str, problem: tuple[str, Problem], status: str = SKIPPED) -> "RunRecord":
+        return cls(solver, problem[0], len(problem[1].starts), num_teams(problem[1]), status)
+
+
+def num_teams(problem: Problem) -> int:
+    return len(set(start.color for start in problem.starts))
+
+
+def solution_cost(sol: Union[Solution, int, None]) -> tuple[Optional[int], Optional[int]]:
+    if isinstance(sol, Solution):
+        lengths = [len(path.route) - 1 for path in sol.paths]
+        return sum(lengths), max(lengths, default=0)
+    if isinstance(sol, int):
+        # CBS-TA only reports its cost
+        return sol, None
+    return None, None
+
+
+@dataclass
+class Claim:
+    solver: str
+    map: str
+    # "host:pid" of the driver that is running the map
+    owner: str
+    time: float
+
+
+def owner_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ResultStore:
+    """
+    Append-only JSON Lines file with one RunRecord per line. Every record is written as soon as its run
+    finishes, so a crash loses at most the run that was in progress. When a run is recorded more than once
+    the last record counts.
+
+    Drivers on several machines can share one store: before running a map a driver appends a claim for it,
+    and maps that are finished or claimed by another live driver are skipped. Claims are abandoned when their
+    driver died (only detectable on the same host) or after claim_expiry seconds.
+
+    With a key and timeout, records made with another solver key or timeout do not count as finished,
+    so those maps are run again. The same goes for the memory limit, None being no limit, unless it is
+    ANY_LIMIT. Appended records get the store's key, timeout and memory limit.
+
+    Skipped and cancelled runs were decided by a sweep policy, they only count as finished for a store with
+    the same policy. Sweeps with another policy run them again.
+    """
+
+    def __init__(self, path: pathlib.Path, claim_expiry: float = 60 * 60, key: Optional[str] = None,
+                 timeout: Optional[float] = None, memory_limit: Optional[int] = ANY_LIMIT,
+                 policy: Optional[str] = None):
+        self.path = path
+        self.claim_expiry = claim_expiry
+        self.key = key
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.policy = policy
+        self._records: dict[tuple[str, str], RunRecord] = {}
+        self._claims: dict[tuple[str, str], Claim] = {}
+        self._offset = 0
+        self._complete = True
+
+    def __reduce__(self):
+        # workers only need the file and read it themselves, into one store per process that is kept up to date
+        # incrementally, instead of reading the whole file again for every task
+        return shared_store, (self.path, self.claim_expiry, self.key, self.timeout, self.memory_limit,
+                              self.policy)
+
+    def append(self, record: RunRecord):
+        record.key = self.key if record.key is None else record.key
+        record.timeout = self.timeout if record.timeout is None else record.timeout
+        if self.memory_limit != ANY_LIMIT:
+            record.memory_limit = self.memory_limit
+        if record.status in (SKIPPED, CANCELLED) and record.policy is None:
+            record.policy = self.policy
+        with self._locked() as f:
+            self._write(f, asdict(record))
+
+    def claim(self, solver: str, map_name: str, owner: str) -> bool:
+        """
+        Claims the run of solver on map_name for owner, returns False when it is finished or claimed by another driver.
+        """
+        with self._locked() as f:
+            if self._finished(self._records.get((solver, map_name))):
+                return False
+            claim = self._claims.get((solver, map_name))
+            if claim is not None and claim.owner != owner and not self._abandoned(claim):
+                return False
+            self._write(f, {"kind": "claim", **asdict(Claim(solver, map_name, owner, time.time()))})
+            return True
+
+    def claimer(self, solver: str, owner: str) -> Callable[[tuple[str, Problem]], bool]:
+        return partial(_claim_problem, self, solver, owner)
+
+    def finished(self, solver: str, map_name: str) -> bool:
+        self.refresh()
+        return self._finished(self._records.get((solver, map_name)))
+
+    def _finished(self, record: Optional[RunRecord]) -> bool:
+        return self._valid(record) and (record.status not in (SKIPPED, CANCELLED) or record.policy == self.policy)
+
+    def _valid(self, record: Optional[RunRecord]) -> bool:
+        # records of older stores have no key and timeout, they only count for stores without them. Without a
+        # memory limit they were made without one.
+        return record is not None and (self.key is None or record.key == self.key) \
+            and (self.timeout is None or record.timeout == self.timeout) \
+            and (self.memory_limit == ANY_LIMIT or record.memory_limit == self.memory_limit)
+
+    def _abandoned(self, claim: Claim) -> bool:
+        if time.time() - claim.time > self.claim_expiry:
+            return True
+        host, pid = claim.owner.rsplit(":", 1)
+        return host == socket.gethostname() and not is_alive(int(pid))
+
+    @contextmanager
+    def _locked(self):
+        with open(self.path, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                self.refresh()
+                yield f
+            finally:
+                f.flush()
+                fcntl.flock(f, fcntl.LOCK_UN)
+        self.refresh()
+
+    def _write(self, f, values: dict):
+        # a crash while writing can leave half a line, don't append to it
+        f.write((b"" if self._complete else b"\n") + json.dumps(values).encode() + b"\n")
+
+    def refresh(self):
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        self._complete = data == b"" or data.endswith(b"\n")
+        lines = data.split(b"\n")[:-1]
+        self._offset += sum(len(line) + 1 for line in lines)
+        for line in lines:
+            try:
+                values = json.loads(line)
+            except ValueError:
+                continue
+            if values.pop("kind", None) == "claim":
+                claim = Claim(**{k: v for k, v in values.items() if k in _claim_fields})
+                self._claims[(claim.solver, claim.map)] = claim
+            else:
+                record = RunRecord(**{k: v for k, v in values.items() if k in _record_fields})
+                self._records[(record.solver, record.map)] = record
+
+    def records(self, solver: Optional[str] = None) -> list[RunRecord]:
+        self.refresh()
+        return [r for r in self._records.values() if (solver is None or r.solver == solver) and self._valid(r)]
+
+    def times(self, solver: str, measure: str = "wall_time",
+              cancelled: bool = False) -> dict[int, list[Optional[float]]]:
+        """
+        The times of the runs of solver per number of agents, None for runs that were not solved.
+        measure is wall_time, process_time or solver_time. Solved runs without the measure, such as runs of solvers
+        that do not report their runtime, are left out.
+
+        Skipped runs are left out, and so are cancelled runs unless cancelled is set, then the runs cancelled by
+        the store's policy count as not solved. Graphs only show the runs that happened (see partial), sweep
+        policies need the cancelled runs of the batches they decided.
+        """
+        res: dict[int, list[RunRecord]] = {}
+        for record in self.records(solver):
+            if record.status == SKIPPED or \
+                    record.status == CANCELLED and not (cancelled and record.policy == self.policy):
+                continue
+            if record.solved and getattr(record, measure) is None:
+                continue
+            res.setdefault(record.agents, []).append(record)
+        return {
+            agents: [None if not r.solved else getattr(r, measure) for r in sorted(records, key=lambda r: r.map)]
+            for agents, records in sorted(res.items())
+        }
+
+    def partial(self, solver: str) -> set[int]:
+        """
+        The numbers of agents of the batches of solver with cancelled runs, their times only cover part of the batch.
+        """
+        return set(r.agents for r in self.records(solver) if r.status == CANCELLED)
+
+
+# the stores of the current (worker) process, see ResultStore.__reduce__
+_stores: dict[tuple, ResultStore] = {}
+
+
+def shared_store(*args) -> ResultStore:
+    if args not in _stores:
+        _stores[args] = ResultStore(*args)
+    return _stores[args]
+
+
+def _claim_problem(store: ResultStore, solver: str, owner: str, problem: tuple[str, Problem]) -> bool:
+    return store.claim(solver, problem[0], owner)
+
+
+_record_fields = set(field.name for field in fields(RunRecord))
+_claim_fields = set(field.name for field in fields(Claim))
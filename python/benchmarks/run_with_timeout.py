@@ -1,16 +1,48 @@
+import os
+import pathlib
+import tempfile
 import time
-from multiprocessing import Pool
 from typing import Optional, Tuple
 
-from func_timeout import func_timeout, FunctionTimedOut
 from mapfmclient import Problem, Solution
-from tqdm import tqdm
 
 from python.algorithm import MapfAlgorithm
+from python.benchmarks.process import RunStatus, SolverMemout, SolverTimeout, alarm
+from python.benchmarks.stats import RunStats
 
+# (wall time if solved, solution, how the run ended, where the time went)
+RunResult = Tuple[Optional[float], Optional[Solution], RunStatus, RunStats]
 
-def run_problem_with_timeout_star(args):
-    return run_problem_with_timeout(*args)
+scratch_dir = pathlib.Path("scratch")
+
+# scratch directory of the current (worker) process, set by init_worker
+_workdir: Optional[pathlib.Path] = None
+
+
+def make_workdir(root: pathlib.Path) -> pathlib.Path:
+    workdir = pathlib.Path(tempfile.mkdtemp(prefix=f"worker-{os.getpid()}-", dir=root))
+    # the solver binaries expect these to exist relative to their working directory
+    (workdir / "temp").mkdir()
+    (workdir / "outputs").mkdir()
+    return workdir
+
+
+def init_worker(root: pathlib.Path):
+    global _workdir
+    _workdir = make_workdir(root)
+
+
+def run_claimed_problem(task):
+    """
+    Runs a problem in a pool worker, if it can be claimed. task is (index, claim, run_problem_with_timeout
+    arguments), the result is (index, RunResult), or (index, None) when the problem was not claimed.
+    """
+    index, claim, args = task
+    if claim is not None and not claim(args[1]):
+        return index, None
+    if _workdir is not None:
+        args[0].workdir = _workdir
+    return index, run_problem_with_timeout(*args)
 
 
 def run_problem_with_timeout(
@@ -18,56 +50,38 @@ def run_problem_with_timeout(
         problem: tuple[str, Problem],
         parse_maps: bool = True,
         timeout: int = 2 * 60,
-) -> Tuple[Optional[float], Optional[Solution]]:
-    start = time.time()
+        memory_limit: Optional[int] = None,
+) -> RunResult:
+    stats = RunStats()
     problem[1].timeout = timeout
+    algorithm.deadline = time.monotonic() + timeout
+    algorithm.stats = stats
+    algorithm.memory_limit = memory_limit
+    start = time.perf_counter_ns()
     try:
-        if (parse_maps):
-            sol = func_timeout(
-                timeout,
-                algorithm.solve,
-                (problem[1],),
-            )
-        else:
-            sol = func_timeout(
-                timeout,
-                algorithm.solve,
-                (problem[0],),
-            )
-    except FunctionTimedOut:
-        return None, None
+        # solver binaries are stopped at the deadline by run_solver, the python work around them by the alarm
+        with alarm(timeout):
+            if (parse_maps):
+                sol = algorithm.solve(problem[1])
+            else:
+                sol = algorithm.solve(problem[0])
+    except SolverTimeout:
+        return None, None, RunStatus.TIMEOUT, stats
+    except SolverMemout as e:
+        print(e)
+        return None, None, RunStatus.MEMOUT, stats
     except Exception as e:
         print(e)
-        return None, None
-    end = time.time()
-
-    return end - start, sol
+        return None, None, RunStatus.CRASHED, stats
+    finally:
+        stats.add_phase("total", time.perf_counter_ns() - start)
+        algorithm.deadline = None
+        algorithm.stats = None
+        algorithm.memory_limit = None
 
-
-def run_with_timeout(
-        algorithm: MapfAlgorithm,
-        problems: list[tuple[str, Problem]],
-        parse_maps: bool = True,
-        timeout: int = 2 * 60,
-) -> list[Tuple[Optional[float], Optional[Solution]]]:
-    return list(
-        [run_problem_with_timeout_star([algorithm, problem, parse_maps, timeout]) for problem in tqdm(problems)]
-    )
-
-
-def run_with_timeout_and_Pool(
-        p: Pool,
-        algorithm: MapfAlgorithm,
-        problems: list[tuple[str, Problem]],
-        parse_maps: bool = True,
-        timeout: int = 2 * 60,
-) -> list[Optional[float]]:
-    return list(
-        tqdm(
-            p.imap(
-                run_problem_with_timeout_star,
-                [(algorithm, problem, parse_maps, timeout) for problem in problems],
-            ),
-            total=len(problems)
-        )
-    )
+    wall_time = stats.seconds("total")
+    if wall_time > timeout:
+        return None, None, RunStatus.TIMEOUT, stats
+    if sol is None:
+        return None, None, RunStatus.FINISHED, stats
+    return wall_time, sol, RunStatus.FINISHED, stats
@@ -0,0 +1,102 @@
+"""
+Time and peak memory of every stage of making and reading a map, for mazes from 32x32 up to 1024x1024.
+
+    PYTHONPATH=. python -m python.benchmarks.scaling
+    PYTHONPATH=. python -m python.benchmarks.scaling --sizes 256,512,1024 --agents 400
+
+Peak memory is what python and numpy allocated during the stage, measured with tracemalloc in a second run of
+the stage so that tracing does not slow down the timed run.
+"""
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+import numpy as np
+from mapfmclient import MarkedLocation, Problem
+
+from python.benchmarks.distance import free_cells, iter_distance_fields
+from python.benchmarks.grid import intern_grid
+from python.benchmarks.map import MapGenerator
+from python.benchmarks.parse_map import MapParser
+from python.benchmarks.placement import place_agents
+
+stages = ["maze", "distances", "placement", "write", "parse"]
+
+
+def measure(stage: Callable[[], object]) -> Tuple[Tuple[float, int], object]:
+    """
+    The seconds and peak bytes allocated of running stage, and what it returned.
+    """
+    start = time.perf_counter()
+    result = stage()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        stage()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (seconds, peak), result
+
+
+def scale(size: int, agents: int, seed: int, directory: str) -> dict:
+    generator = MapGenerator(directory)
+    parser = MapParser(directory)
+    results = {}
+
+    def maze():
+        return intern_grid(MapGenerator.generate_maze(size, size, 0.65, 3, random.Random(seed)))
+
+    def distances():
+        # the fields of the agents are only needed one at a time, so this is bounded by chunk_bytes
+        return sum(1 for _ in iter_distance_fields(free, sources))
+
+    def placement():
+        return place_agents(free, agents, 0, 1, random.Random(seed))
+
+    def write():
+        generator.store_map(name, problem)
+
+    def parse():
+        return parser.parse_map(name)
+
+    results["maze"], grid = measure(maze)
+    free = free_cells(grid)
+    cells = np.flatnonzero(free)
+    sources = [(int(cell % size), int(cell // size))
+               for cell in cells[random.Random(seed).sample(range(len(cells)), min(agents, len(cells)))]]
+    results["distances"], _ = measure(distances)
+    results["placement"], placed = measure(placement)
+    if placed is None:
+        raise ValueError(f"could not place {agents} agents on a {size}x{size} maze")
+    starts, goals = placed
+    problem = Problem(grid, size, size, [MarkedLocation(0, s.x, s.y) for s in starts],
+                      [MarkedLocation(0, g.x, g.y) for g in goals])
+    name = f"scaling-{size}"
+    results["write"], _ = measure(write)
+    results["parse"], _ = measure(parse)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m python.benchmarks.scaling", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="32,64,128,256,512,1024", help="comma separated widths of square mazes")
+    parser.add_argument("--agents", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f"{'size':>6} " + " ".join(f"{stage:>20}" for stage in stages))
+    with tempfile.TemporaryDirectory() as directory:
+        for size in (int(s) for s in args.sizes.split(",")):
+            results = scale(size, args.agents, args.seed, directory)
+            print(f"{size:>6} " + " ".join(f"{results[stage][0]:9.3f}s {results[stage][1] / 2 ** 20:7.1f}MiB"
+                                           for stage in stages), flush=True)
+
+
+if __name__ == '__main__':
+    main()
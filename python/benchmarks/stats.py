@@ -0,0 +1,42 @@
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+
+@dataclass
+class RunStats:
+    """
+    Where the time of one run went. Adapters and run_solver add to it while a run is in progress, a run of a
+    prematch adapter adds up all solver calls solve_bb makes.
+    """
+    # nanoseconds per phase: write (scenario and map files), spawn (starting the solver), wait (until it exited),
+    # parse (reading its output) and total (the whole solve)
+    phases: Dict[str, int] = field(default_factory=dict)
+    # largest peak resident set size of the solver processes, in bytes
+    peak_rss: Optional[int] = None
+    # statistics reported by the solver itself, like runtime and expanded nodes
+    solver: Dict[str, float] = field(default_factory=dict)
+    solver_calls: int = 0
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter_ns() - start)
+
+    def add_phase(self, name: str, ns: int):
+        self.phases[name] = self.phases.get(name, 0) + ns
+
+    def add_rss(self, rss: int):
+        self.peak_rss = rss if self.peak_rss is None else max(self.peak_rss, rss)
+
+    def add_solver(self, values: Dict[str, float]):
+        for key, value in values.items():
+            if isinstance(value, (int, float)):
+                self.solver[key] = self.solver.get(key, 0) + value
+
+    def seconds(self, name: str) -> Optional[float]:
+        return self.phases[name] / 1e9 if name in self.phases else None
@@ -0,0 +1,187 @@
+"""
+A whole benchmark suite in one binary file, instead of a text file per map.
+
+The file starts with a JSON header holding the map names and the offset, dtype and shape of every array,
+followed by the arrays themselves:
+
+- walls: the wall bits of every distinct grid, each row packed to whole bytes
+- grid_offsets, grid_shapes: where the rows of each grid start in walls and its (height, width)
+- grids: the index of the grid of every map
+- agent_offsets: where the agents of every map start in starts and goals
+- starts, goals: int16 (x, y, color) of every agent
+
+The file is memory mapped, so opening a suite only reads the header. Problems are built when they are asked for.
+Benchmark sweeps run from a suite file with SuiteSpec.suite_file (--suite-file).
+
+    PYTHONPATH=. python -m python.benchmarks.suite python/benchmarks/32x32_1 32x32_1.suite
+"""
+import json
+import os
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from mapfmclient import MarkedLocation, Problem
+
+from python.benchmarks.grid import as_array, grid_key, intern_grid
+
+magic = b"MAPFSUITE1\n"
+# arrays start at multiples of this, so they can be viewed with their own dtype
+alignment = 64
+
+
+def write_suite(path, problems: Iterable[Tuple[str, str, Problem]]):
+    """
+    Writes (batch, name, problem) triples to a suite file at path.
+    """
+    batches: List[str] = []
+    names: List[str] = []
+    grid_index: dict[bytes, int] = {}
+    walls: List[np.ndarray] = []
+    grid_offsets: List[int] = []
+    grid_shapes: List[Tuple[int, int]] = []
+    grids: List[int] = []
+    agent_offsets = [0]
+    starts: List[Tuple[int, int, int]] = []
+    goals: List[Tuple[int, int, int]] = []
+
+    rows = 0
+    for batch, name, problem in problems:
+        packed = np.packbits(as_array(problem.grid) != 0, axis=1)
+        key = grid_key(problem.grid)
+        if key not in grid_index:
+            grid_index[key] = len(walls)
+            walls.append(packed)
+            grid_offsets.append(rows)
+            grid_shapes.append((problem.height, problem.width))
+            rows += problem.height
+
+        batches.append(batch)
+        names.append(name)
+        grids.append(grid_index[key])
+        starts.extend((s.x, s.y, s.color) for s in problem.starts)
+        goals.extend((g.x, g.y, g.color) for g in problem.goals)
+        agent_offsets.append(len(starts))
+
+    row_bytes = max((w.shape[1] for w in walls), default=0)
+    arrays = {
+        "walls": np.concatenate([np.pad(w, ((0, 0), (0, row_bytes - w.shape[1]))) for w in walls])
+        if walls else np.zeros((0, 0), dtype=np.uint8),
+        "grid_offsets": np.array(grid_offsets, dtype=np.int64),
+        "grid_shapes": np.array(grid_shapes, dtype=np.int32).reshape(-1, 2),
+        "grids": np.array(grids, dtype=np.int32),
+        "agent_offsets": np.array(agent_offsets, dtype=np.int64),
+        "starts": np.array(starts, dtype=np.int16).reshape(-1, 3),
+        "goals": np.array(goals, dtype=np.int16).reshape(-1, 3),
+    }
+
+    layout = {}
+    offset = 0
+    for key, array in arrays.items():
+        layout[key] = {"offset": offset, "dtype": array.dtype.str, "shape": array.shape}
+        offset += -(-array.nbytes // alignment) * alignment
+    header = json.dumps({"batches": batches, "names": names, "arrays": layout}).encode()
+    start = -(-(len(magic) + 8 + len(header)) // alignment) * alignment
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(magic + len(header).to_bytes(8, "little") + header)
+        for key, array in arrays.items():
+            f.seek(start + layout[key]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(start + offset)
+    os.replace(tmp, path)
+
+
+class Suite:
+    """
+    A suite file opened for reading, indexable like a list of (name, Problem).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(magic)) != magic:
+                raise ValueError(f"{path} is not a suite file")
+            header_length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_length))
+        start = -(-(len(magic) + 8 + header_length) // alignment) * alignment
+
+        self.batches: List[str] = header["batches"]
+        self.names: List[str] = header["names"]
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        self._arrays = {}
+        for key, layout in header["arrays"].items():
+            dtype = np.dtype(layout["dtype"])
+            shape = tuple(layout["shape"])
+            begin = start + layout["offset"]
+            count = int(np.prod(shape))
+            self._arrays[key] = data[begin:begin + count * dtype.itemsize].view(dtype).reshape(shape)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, index: int) -> Tuple[str, Problem]:
+        return self.names[index], self.problem(index)
+
+    def __iter__(self) -> Iterator[Tuple[str, Problem]]:
+        return (self[i] for i in range(len(self)))
+
+    def agents(self, index: int) -> int:
+        offsets = self._arrays["agent_offsets"]
+        return int(offsets[index + 1] - offsets[index])
+
+    def problem(self, index: int) -> Problem:
+        grid = int(self._arrays["grids"][index])
+        height, width = (int(v) for v in self._arrays["grid_shapes"][grid])
+        offset = int(self._arrays["grid_offsets"][grid])
+        walls = np.unpackbits(self._arrays["walls"][offset:offset + height], axis=1)[:, :width]
+
+        begin, end = self._arrays["agent_offsets"][index:index + 2]
+        starts = [MarkedLocation(int(c), int(x), int(y)) for x, y, c in self._arrays["starts"][begin:end]]
+        goals = [MarkedLocation(int(c), int(x), int(y)) for x, y, c in self._arrays["goals"][begin:end]]
+        return Problem(intern_grid(walls), width, height, starts, goals)
+
+
+class SuiteParser:
+    """
+    The batches of a suite file, with the methods of MapParser that sweeps use, so a sweep can run from a suite
+    file instead of a directory of text maps. Problems are only built when their batch is parsed.
+    """
+
+    def __init__(self, path):
+        self.suite = Suite(path)
+        # batch to map name to index in the suite
+        self._indices: Dict[str, Dict[str, int]] = {}
+        for index, (batch, name) in enumerate(zip(self.suite.batches, self.suite.names)):
+            self._indices.setdefault(batch, {})[name] = index
+
+    def batch_names(self, folder) -> List[str]:
+        return sorted(self._indices[folder])
+
+    def parse_batch(self, folder, names: Optional[List[str]] = None) -> List[Tuple[str, Problem]]:
+        names = self.batch_names(folder) if names is None else names
+        return [(name, self.suite.problem(self._indices[folder][name])) for name in names]
+
+    def peek(self, folder, name: str) -> Problem:
+        return self.suite.problem(self._indices[folder][name])
+
+    def iter_batches(self) -> Iterator[Tuple[int, str]]:
+        return iter(sorted((self.suite.agents(next(iter(indices.values()))), batch)
+                           for batch, indices in self._indices.items()))
+
+
+def pack_directory(map_root, path):
+    """
+    Writes every batch directory of map_root to one suite file at path.
+    """
+    from python.benchmarks.parse_map import MapParser
+
+    parser = MapParser(map_root)
+    folders = sorted(n for n in os.listdir(map_root)
+                     if os.path.isdir(os.path.join(map_root, n)) and not n.startswith("."))
+    write_suite(path, ((folder, name, problem) for folder in folders for name, problem in parser.parse_batch(folder)))
+
+
+if __name__ == '__main__':
+    pack_directory(sys.argv[1], sys.argv[2])
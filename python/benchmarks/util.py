@@ -1,20 +1,29 @@
+import ast
 import pathlib
 from typing import Optional
 
+from python.benchmarks.results import ResultStore
 
-def read_from_file(filename: pathlib.Path, wanted_num_agents: int) -> list[Optional[float]]:
+
+def read_all_from_file(filename: pathlib.Path) -> dict[int, list[Optional[float]]]:
+    # the results_*.txt files of earlier benchmarks: one "num_agents: (times...)" line per number of agents
+    res = {}
     with open(filename, "r") as f:
         for l in [l.strip() for l in f.readlines() if l.strip() != ""]:
             before, after = l.split(":")
-            after_list = eval(after)
-            num_agents = int(before)
-            if num_agents == wanted_num_agents:
-                return after_list
+            res[int(before)] = list(ast.literal_eval(after))
+    return res
+
 
-    raise Exception("number of agents not found in file")
+def read_times(filename: pathlib.Path, solver: str, measure: str = "wall_time") -> dict[int, list[Optional[float]]]:
+    # the old results files only have wall times, nothing for the other measures
+    if filename.suffix == ".jsonl":
+        return ResultStore(filename).times(solver, measure)
+    return read_all_from_file(filename) if measure == "wall_time" else {}
 
 
-def output_data(file: pathlib.Path, data: dict[int, list[float]]):
-    with open(file, "w") as f:
-        for i, r in sorted([(a, b) for a, b in data.items()], key=lambda x: x[0]):
-            f.write(f"{i}: {r}\n")
+def read_partial(filename: pathlib.Path, solver: str) -> set[int]:
+    # the numbers of agents of the batches that were only partly run, the old results files have no cancelled runs
+    if filename.suffix == ".jsonl":
+        return ResultStore(filename).partial(solver)
+    return set()
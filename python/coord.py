@@ -1,20 +1,22 @@
 from __future__ import annotations
 
-from ctypes import Union
+from typing import Tuple, Union
 
 from mapfmclient import MarkedLocation
 
 
 class Coord:
+    __slots__ = ("x", "y")
+
     def __init__(self, x: int, y: int):
         self.x = x
         self.y = y
 
     def __hash__(self) -> int:
-        return tuple.__hash__((self.x, self.y))
+        return hash((self.x, self.y))
 
     def __eq__(self, other: Coord):
-        return (self.x, self.y) == (other.x, other.y)
+        return self.x == other.x and self.y == other.y
 
     def __repr__(self):
         return f"Coord({self.x}, {self.y})"
@@ -42,8 +44,14 @@ class Coord:
             return Coord(self.x * other.x, self.y * other.y)
 
     def manhattan_distance(self, other: Coord) -> int:
-        diff = other.__sub__(self)
-        return abs(diff.x) + abs(diff.y)
+        return abs(other.x - self.x) + abs(other.y - self.y)
+
+    def pack(self, width: int) -> int:
+        return pack(self.x, self.y, width)
+
+    @classmethod
+    def unpack(cls, index: int, width: int) -> Coord:
+        return cls(*unpack(index, width))
 
     @classmethod
     def from_marked_location(cls, m: MarkedLocation) -> Coord:
@@ -51,3 +59,15 @@ class Coord:
 
 
 UncalculatedCoord = Coord(-1, -1)
+
+
+# Cells as a single int y * width + x, for hot loops where allocating a Coord per cell is too slow.
+# These are also the indices of the cell in a flattened (height, width) numpy grid.
+
+def pack(x: int, y: int, width: int) -> int:
+    return y * width + x
+
+
+def unpack(index: int, width: int) -> Tuple[int, int]:
+    y, x = divmod(index, width)
+    return x, y
@@ -1,8 +1,6 @@
 #!/bin/bash
 
 repo=/data/BCP-paper
-PYTHONPATH=$repo:$PYTHONPATH python3.9 $repo/python/benchmarks/comparison_25percent_1teams.py
-PYTHONPATH=$repo:$PYTHONPATH python3.9 $repo/python/benchmarks/comparison_25percent_3teams.py
-PYTHONPATH=$repo:$PYTHONPATH python3.9 $repo/python/benchmarks/comparison_25percent_6teams.py
-PYTHONPATH=$repo:$PYTHONPATH python3.9 $repo/python/benchmarks/comparison_25percent_12teams.py
-PYTHONPATH=$repo:$PYTHONPATH python3.9 $repo/python/benchmarks/comparison_warehouse.py
+# all suites share one pool of BENCHMARK_PROCESSES workers
+PYTHONPATH=$repo:$PYTHONPATH python3.9 -m python.benchmarks 32x32_1 32x32_3 32x32_6 32x32_12 warehouse \
+  --processes "${BENCHMARK_PROCESSES:-1}"